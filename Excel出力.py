@@ -0,0 +1,107 @@
+import os
+from 計測 import span
+from スキーマ import RATE_COLUMNS, RATE_FORMAT
+
+# 見出し行の書式（pandas の to_excel と同じ）
+HEADER_FORMAT = {"bold": True, "border": 1, "align": "center", "valign": "top"}
+
+# DataFrameを書き込む時に一度に変換する行数
+CHUNK_SIZE = 10000
+
+# 1シートに書き込める最大行数（見出し行を含む）
+EXCEL_MAX_ROWS = 1048576
+
+# 行を順に書き込むシート（書き込みながら列ごとの最大文字数を記録し、閉じる時に列幅を設定）
+class StreamingSheet:
+    def __init__(self, worksheet, headers, header_format, column_width=None, column_formats=None):
+        self.worksheet = worksheet
+        self.column_width = column_width
+        self.column_formats = column_formats or {}
+        self.widths = [0] * len(headers)
+        self.row = 0
+        self.write_row(headers, header_format)
+
+    # 1行の書き込み（None は空欄）
+    def write_row(self, values, cell_format=None):
+        worksheet = self.worksheet
+        widths = self.widths
+        for col_idx, value in enumerate(values):
+            if value is None:
+                continue
+            worksheet.write(self.row, col_idx, value, cell_format or self.column_formats.get(col_idx))
+            # 小数は率の表示形式（小数点以下2桁と %）の文字数
+            length = len(f"{value:.2f}%") if isinstance(value, float) else len(str(value))
+            if length > widths[col_idx]:
+                widths[col_idx] = length
+        self.row += 1
+
+    def write_rows(self, rows):
+        for values in rows:
+            self.write_row(values)
+
+    # DataFrameの書き込み（CHUNK_SIZE 行ずつ変換し、欠損値は空欄）
+    def write_dataframe(self, df):
+        for start in range(0, len(df), CHUNK_SIZE):
+            chunk = df.iloc[start:start + CHUNK_SIZE].astype(object)
+            self.write_rows(chunk.where(chunk.notna(), None).itertuples(index=False, name=None))
+
+    # 列幅の設定（固定幅の指定がなければ、列名と値の最大文字数）
+    def finish(self):
+        for col_idx, width in enumerate(self.widths):
+            self.worksheet.set_column(col_idx, col_idx, self.column_width if self.column_width is not None else width)
+
+# 行を順に書き込むExcelファイル（xlsxwriter の constant_memory モードで、行数に関係なく使用メモリは一定）
+# 一時ファイルに書き込み、正常に閉じた時だけ置き換えるため、途中で失敗しても元のファイルは壊れない
+class StreamingWorkbook:
+    def __init__(self, file_path):
+        import xlsxwriter
+        self.file_path = file_path
+        # 一時ファイルは .xlsx で終わらない名前にし、集計の対象にならないようにする
+        self.temp_path = f"{file_path}.tmp"
+        self.workbook = xlsxwriter.Workbook(self.temp_path, {"constant_memory": True})
+        self.header_format = self.workbook.add_format(HEADER_FORMAT)
+        self.sheets = []
+
+    # シートの追加（column_formats は 列番号 → 書式の設定、率の列には % の表示形式を付ける）
+    def add_sheet(self, headers, name=None, column_width=None, column_formats=None):
+        headers = list(headers)
+        properties = {col_idx: {"num_format": RATE_FORMAT} for col_idx, header in enumerate(headers) if header in RATE_COLUMNS}
+        properties.update(column_formats or {})
+        formats = {col_idx: self.workbook.add_format(format_properties) for col_idx, format_properties in properties.items()}
+        sheet = StreamingSheet(self.workbook.add_worksheet(name), headers, self.header_format, column_width, formats)
+        self.sheets.append(sheet)
+        return sheet
+
+    def close(self):
+        try:
+            for sheet in self.sheets:
+                sheet.finish()
+            self.workbook.close()
+            os.replace(self.temp_path, self.file_path)
+        except BaseException:
+            if os.path.exists(self.temp_path):
+                os.remove(self.temp_path)
+            raise
+
+    # 書き込みの中止（一時ファイルを削除）
+    def discard(self):
+        try:
+            self.workbook.close()
+        except Exception:
+            pass
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+# Excelファイルの保存（一時ファイルに書き込んでから置き換えるため、途中で終了しても元のファイルは壊れない）
+def write_excel_atomic(df, file_path, column_width=None, sheet_name=None):
+    with span("io:ExcelWriter", path=file_path, rows=len(df)), StreamingWorkbook(file_path) as workbook:
+        workbook.add_sheet(df.columns, sheet_name, column_width).write_dataframe(df)
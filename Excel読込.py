@@ -0,0 +1,48 @@
+import pandas as pd
+from スキーマ import DTYPES
+
+# スキーマに従った型の読み込み
+# 列ごとに型を指定して読み込むため、ファイルごとの型の推定や、率の文字列の保持がなくなる
+
+# 率の列を数値に変換（以前の形式の "12.50%" の文字列も数値にする）
+def to_rate(values):
+    if values.dtype == object or pd.api.types.is_string_dtype(values):
+        values = values.astype(str).str.rstrip("%")
+    return pd.to_numeric(values, errors="coerce").astype(DTYPES["率"])
+
+# 数値に変換できなかった値と、件数の列の整数でない値があれば、列名と行番号を含む ValueError
+def check_numbers(name, kind, values, numbers):
+    checks = [(numbers.isna() & values.notna(), "数値でない値")]
+    if kind == "件数":
+        checks.append((numbers.notna() & (numbers % 1 != 0), "整数でない値"))
+    for invalid, reason in checks:
+        if invalid.any():
+            row = invalid.to_numpy().argmax()
+            raise ValueError(f"{name}に{reason}があります（{row + 2}行目: {values.iloc[row]}）")
+
+# スキーマの型に変換（スキーマにない列はそのまま）
+# strict=True の場合、数値に変換できない値は空欄にせず ValueError にする（取込時の検証用）
+def apply_schema(df, schema, strict=False):
+    for name, kind in schema:
+        if name not in df.columns:
+            continue
+        if kind in ("率", "件数"):
+            numbers = to_rate(df[name]) if kind == "率" else pd.to_numeric(df[name], errors="coerce")
+            if strict:
+                check_numbers(name, kind, df[name], numbers)
+            df[name] = numbers.astype(DTYPES[kind])
+        elif df[name].dtype != DTYPES[kind]:
+            df[name] = df[name].astype(DTYPES[kind])
+    return df
+
+# 型を指定したExcelの読み込み（columns を指定した場合はその列だけを残す）
+# strict=True の場合、件数の列も元の値のまま読み込んでから apply_schema で検証する
+def read_typed_excel(file_path, schema, columns=None, strict=False):
+    kinds = dict(schema)
+    wanted = set(columns) if columns is not None else None
+    # 社員名は数字だけの名前も文字列として読み込み、件数は読み込み時に整数にする
+    dtype = {name: (str if kind == "社員" else DTYPES[kind]) for name, kind in schema
+             if kind != "率" and not (strict and kind == "件数") and (wanted is None or name in wanted)}
+    usecols = (lambda name: name in wanted) if wanted is not None else None
+    df = pd.read_excel(file_path, usecols=usecols, dtype=dtype)
+    return apply_schema(df, [(name, kinds[name]) for name in df.columns if name in kinds], strict)
@@ -0,0 +1,188 @@
+import os
+import json
+import time
+import socket
+from contextlib import contextmanager
+from datetime import datetime
+import pandas as pd
+from 計測 import span
+from スキーマ import DAILY_SCHEMAS
+from Excel読込 import apply_schema, read_typed_excel
+
+# 日次ファイルの追記ジャーナル
+# 保存は「誤配管理_YYYY_MM_DD.xlsx.journal」に追加した行を1行のJSONとして追記するだけにし（追加行数に比例する処理）、
+# Excelファイルはロックを取ってジャーナルを反映した内容で作り直す（圧縮）
+# 圧縮はExcelファイル全体を書き直すため、その日の最初の保存か、ジャーナルが COMPACT_ENTRIES 件・COMPACT_BYTES を超えた
+# 保存の時と、集計コマンド compact でのみ行う（読み込みは read_day_frame でジャーナルも合わせて読む）
+# 複数の端末が同じ日に保存しても、ロック中に追記するため互いの保存を上書きしない
+
+JOURNAL_SUFFIX = ".journal"
+LOCK_SUFFIX = ".lock"
+
+# 保存時に圧縮するジャーナルの件数とサイズ（バイト）
+COMPACT_ENTRIES = 20
+COMPACT_BYTES = 256 * 1024
+
+# ロックの待ち時間と、異常終了などで残ったロックを無効とみなす時間（秒）
+LOCK_TIMEOUT = 30
+STALE_LOCK_SECONDS = 120
+
+# ジャーナルの操作（追加: 行を追加、置換: 全ての行を置き換え、反映: 社員名をキーに更新・追加）
+OPERATIONS = ("追加", "置換", "反映")
+
+# 圧縮時の列幅（各アプリの保存時と同じ）
+COLUMN_WIDTHS = {
+    "誤配管理": 20,
+    "履行率管理": None,
+}
+
+class LockTimeout(TimeoutError):
+    pass
+
+def journal_path(file_path):
+    return f"{file_path}{JOURNAL_SUFFIX}"
+
+# Excelファイルかジャーナルのどちらかがあれば、その日のデータがある
+def day_exists(file_path):
+    return os.path.exists(file_path) or os.path.exists(journal_path(file_path))
+
+# フォルダ内のファイル名に、ジャーナルだけがある日のExcelファイル名を加える（一覧の対象にするため）
+def with_journal_days(filenames):
+    names = set(filenames)
+    journal_days = [name[:-len(JOURNAL_SUFFIX)] for name in filenames
+                    if name.endswith(JOURNAL_SUFFIX) and name[:-len(JOURNAL_SUFFIX)] not in names]
+    return list(filenames) + journal_days
+
+# 日ごとのロック（ロックファイルを排他的に作成、timeout=0 の場合は待たずに LockTimeout）
+@contextmanager
+def day_lock(file_path, timeout=LOCK_TIMEOUT):
+    lock_path = f"{file_path}{LOCK_SUFFIX}"
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) > STALE_LOCK_SECONDS:
+                    os.remove(lock_path)
+                    continue
+            except FileNotFoundError:
+                continue
+            if time.monotonic() >= deadline:
+                raise LockTimeout(f"他の端末が保存中です: {os.path.basename(file_path)}")
+            time.sleep(0.05)
+    try:
+        os.write(fd, f"{socket.gethostname()} {os.getpid()}".encode("utf-8"))
+        os.close(fd)
+        yield
+    finally:
+        try:
+            os.remove(lock_path)
+        except FileNotFoundError:
+            pass
+
+# 保存内容をジャーナルへ追記（ロック中に1行を書き込んでディスクへ反映）
+def append_entry(file_path, operation, df):
+    if operation not in OPERATIONS:
+        raise ValueError(f"不明な操作です: {operation}")
+    frame = df.astype(object).where(df.notna(), None)
+    entry = {
+        "操作": operation,
+        "列": [str(column) for column in df.columns],
+        "行": frame.values.tolist(),
+        "日時": datetime.now().isoformat(timespec="seconds"),
+        "端末": socket.gethostname(),
+    }
+    line = json.dumps(entry, ensure_ascii=False, default=str) + "\n"
+    with span("journal:append", path=file_path, rows=len(df)), day_lock(file_path):
+        with open(journal_path(file_path), "a", encoding="utf-8") as file:
+            file.write(line)
+            file.flush()
+            os.fsync(file.fileno())
+
+# ジャーナルの読み込み（書き込み途中で終了した最後の行は無視）
+def read_entries(file_path):
+    try:
+        with open(journal_path(file_path), "r", encoding="utf-8") as file:
+            lines = file.readlines()
+    except FileNotFoundError:
+        return []
+    entries = []
+    for line in lines:
+        try:
+            entries.append(json.loads(line))
+        except ValueError:
+            continue
+    return entries
+
+# 保存時に圧縮するか（Excelファイルがまだない日か、ジャーナルが件数・サイズの上限を超えた場合）
+def needs_compaction(file_path):
+    if not os.path.exists(file_path):
+        return True
+    try:
+        if os.path.getsize(journal_path(file_path)) > COMPACT_BYTES:
+            return True
+        with open(journal_path(file_path), "rb") as file:
+            return sum(1 for _ in file) >= COMPACT_ENTRIES
+    except FileNotFoundError:
+        return False
+
+# Excelの内容にジャーナルの操作を順に反映
+def apply_entries(df, entries):
+    for entry in entries:
+        rows = pd.DataFrame(entry["行"], columns=entry["列"])
+        if entry["操作"] == "反映":
+            from 履行率処理 import upsert_fulfillment
+            if df is None:
+                df = rows
+            else:
+                with span("pandas:upsert_fulfillment", rows=len(df) + len(rows)):
+                    df = upsert_fulfillment(df, rows)
+        elif entry["操作"] == "置換":
+            df = rows if df is None else pd.concat([df.iloc[:0], rows], ignore_index=True)
+        else:
+            df = rows if df is None else pd.concat([df, rows], ignore_index=True)
+    return df
+
+# Excelファイルとジャーナルを合わせた1日分のデータ（スキーマの型、columns を指定した場合はその列のみ）
+# ジャーナルがある場合は圧縮の途中を読まないよう、ロック中に両方を読み込む
+# strict=True の場合、数値の列に数値でない値があれば ValueError（apply_schema を参照）
+def read_day_frame(kind, file_path, columns=None, strict=False):
+    schema = DAILY_SCHEMAS[kind]["columns"]
+    if not os.path.exists(journal_path(file_path)):
+        return read_typed_excel(file_path, schema, columns, strict)
+    with span("journal:read", path=file_path) as fields, day_lock(file_path):
+        df = read_typed_excel(file_path, schema, strict=strict) if os.path.exists(file_path) else None
+        entries = read_entries(file_path)
+        fields["entries"] = len(entries)
+    df = apply_schema(apply_entries(df, entries), schema, strict)
+    return df if columns is None else df[[column for column in columns if column in df.columns]]
+
+# 圧縮（ジャーナルを反映したExcelファイルを作成してジャーナルを削除）、反映後のDataFrameを返す
+# wait=False の場合、他の端末が使用中・Excelで開かれているなど反映できなければ None を返す（ジャーナルは次の圧縮で反映）
+def compact_day(kind, file_path, wait=True):
+    from Excel出力 import write_excel_atomic
+    try:
+        with span("journal:compact", path=file_path) as fields, day_lock(file_path, LOCK_TIMEOUT if wait else 0):
+            entries = read_entries(file_path)
+            if not entries:
+                return None
+            df = read_typed_excel(file_path, DAILY_SCHEMAS[kind]["columns"]) if os.path.exists(file_path) else None
+            df = apply_schema(apply_entries(df, entries), DAILY_SCHEMAS[kind]["columns"])
+            write_excel_atomic(df, file_path, column_width=COLUMN_WIDTHS[kind])
+            os.remove(journal_path(file_path))
+            fields.update(entries=len(entries), rows=len(df))
+            return df
+    except OSError:
+        if wait:
+            raise
+        return None
+
+# フォルダ以下のジャーナルを列挙（Excelファイルのパス）
+def find_journals(root):
+    for directory, folders, filenames in os.walk(root):
+        folders.sort()
+        for filename in sorted(filenames):
+            if filename.endswith(JOURNAL_SUFFIX):
+                yield os.path.join(directory, filename[:-len(JOURNAL_SUFFIX)])
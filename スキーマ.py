@@ -0,0 +1,47 @@
+# データの列定義（pandas を読み込まずに画面から参照できるよう、処理モジュールとは分けて定義）
+
+# 履行率管理の入力項目（画面の並び順）
+FULFILLMENT_INPUT_COLUMNS = ["社員名", "持ち出し総数", "不履行数", "クレーム", "誤配", "遅刻", "事故"]
+
+# 列の種類ごとの pandas の型と SQLite の型
+# 社員名は同じ値が繰り返されるため category、件数は空欄を許す32ビット整数、率は百分率の数値
+DTYPES = {"社員": "category", "件数": "Int32", "率": "float64"}
+SQL_TYPES = {"社員": "TEXT", "件数": "INTEGER", "率": "REAL"}
+
+# 率の列のExcelの表示形式（値は数値のまま保存し、% は表示形式でのみ付ける）
+RATE_FORMAT = '0.00"%"'
+
+# 日次ファイルの列と種類（各アプリが保存するExcelと同じ列構成）
+DAILY_SCHEMAS = {
+    "誤配管理": {
+        "employee_column": "社員",
+        "columns": [
+            ("社員", "社員"),
+            ("午前の持ち出し個数", "件数"),
+            ("午後の持ち出し個数", "件数"),
+            ("持ち出し総数", "件数"),
+            ("誤配数", "件数"),
+            ("誤配率 (%)", "率"),
+        ],
+    },
+    "履行率管理": {
+        "employee_column": "社員名",
+        "columns": [
+            ("社員名", "社員"),
+            *[(column, "件数") for column in FULFILLMENT_INPUT_COLUMNS[1:]],
+            ("履行率", "率"),
+        ],
+    },
+}
+
+# 月次・年次集計ファイルの列と種類（最後の行は全体）
+SUMMARY_SCHEMA = [
+    ("社員", "社員"),
+    ("持ち出し総数", "件数"),
+    ("誤配数", "件数"),
+    ("誤配率", "率"),
+]
+
+# 率の列名（保存・表示時に % の表示形式を付ける）
+RATE_COLUMNS = {name for layout in DAILY_SCHEMAS.values() for name, kind in layout["columns"] if kind == "率"}
+RATE_COLUMNS |= {name for name, kind in SUMMARY_SCHEMA if kind == "率"}
@@ -0,0 +1,199 @@
+import os
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import closing
+import pandas as pd
+from 設定 import DATA_STORE_PATH
+from 計測 import span
+from ジャーナル import append_entry, compact_day, journal_path, needs_compaction, read_day_frame
+from スキーマ import DAILY_SCHEMAS, SQL_TYPES
+from Excel読込 import apply_schema
+
+# データ種別ごとの列定義（スキーマの列構成と SQLite の型）
+LAYOUTS = {
+    kind: {
+        "employee_column": schema["employee_column"],
+        "columns": [(name, SQL_TYPES[column_kind]) for name, column_kind in schema["columns"]],
+    }
+    for kind, schema in DAILY_SCHEMAS.items()
+}
+
+# ファイル名から日付を取り出すパターン（履行率管理のファイル名には年が含まれない）
+FILENAME_PATTERNS = {
+    "誤配管理": re.compile(r"^誤配管理_(\d{4})_(\d{2})_(\d{2})\.xlsx$"),
+    "履行率管理": re.compile(r"^履行率管理_(\d{2})_(\d{2})\.xlsx$"),
+}
+
+# プロセス内で共有する読み込み結果の件数（ランチャーで入力した日のデータを集計・表示で再利用）
+MEMORY_CACHE_SIZE = 512
+
+_memory = OrderedDict()
+_memory_lock = threading.Lock()
+
+# ファイルの識別キー（絶対パス）
+def cache_key(file_path):
+    return os.path.normcase(os.path.abspath(file_path))
+
+# ファイルの識別情報（更新時刻とサイズ）
+# 追記ジャーナルがある場合はジャーナルも含める（保存のたびに変わり、圧縮後も元の値には戻らない）
+def file_signature(file_path):
+    stats = []
+    for path in (file_path, journal_path(file_path)):
+        try:
+            stats.append(os.stat(path))
+        except FileNotFoundError:
+            pass
+    if not stats:
+        raise FileNotFoundError(2, "ファイルが見つかりません", file_path)
+    return [max(stat.st_mtime_ns for stat in stats), sum(stat.st_size for stat in stats)]
+
+def quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+def column_names(kind):
+    return [name for name, _ in LAYOUTS[kind]["columns"]]
+
+# ファイル名から日付（YYYY-MM-DD）を取得、判別できない場合は None
+def parse_date(kind, file_path, year=None):
+    match = FILENAME_PATTERNS[kind].match(os.path.basename(file_path))
+    if not match:
+        return None
+    parts = match.groups()
+    if len(parts) == 2:
+        if year is None:
+            return None
+        parts = (str(year), *parts)
+    return "-".join(parts)
+
+# 読み込み結果をメモリに保持（古いものから破棄）
+def remember(file_path, signature, df):
+    with _memory_lock:
+        _memory[cache_key(file_path)] = (list(signature), df.copy())
+        _memory.move_to_end(cache_key(file_path))
+        while len(_memory) > MEMORY_CACHE_SIZE:
+            _memory.popitem(last=False)
+
+# メモリに保持している読み込み結果（ファイルが変更されている場合は None）
+def recall(file_path, signature):
+    with _memory_lock:
+        entry = _memory.get(cache_key(file_path))
+        if entry is None or entry[0] != list(signature):
+            return None
+        _memory.move_to_end(cache_key(file_path))
+        return entry[1].copy()
+
+# メモリに保持している読み込み結果を全て破棄
+def clear_memory():
+    with _memory_lock:
+        _memory.clear()
+
+# ストアへの接続（テーブルとインデックスがなければ作成）
+def connect(store_path=DATA_STORE_PATH):
+    os.makedirs(os.path.dirname(store_path), exist_ok=True)
+    conn = sqlite3.connect(store_path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    with conn:
+        for kind, layout in LAYOUTS.items():
+            table = quote(kind)
+            employee = quote(layout["employee_column"])
+            columns = ", ".join(f"{quote(name)} {sql_type}" for name, sql_type in layout["columns"])
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (日付 TEXT NOT NULL, 行番号 INTEGER NOT NULL, {columns}, PRIMARY KEY (日付, 行番号))")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {quote(kind + '_日付_社員')} ON {table} (日付, {employee})")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {quote(kind + '_社員_日付')} ON {table} ({employee}, 日付)")
+        conn.execute("CREATE TABLE IF NOT EXISTS ソースファイル (パス TEXT PRIMARY KEY, 種別 TEXT NOT NULL, 日付 TEXT NOT NULL, 更新時刻 INTEGER NOT NULL, サイズ INTEGER NOT NULL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS ソースファイル_種別_日付 ON ソースファイル (種別, 日付)")
+        conn.execute("CREATE TABLE IF NOT EXISTS 取込エラー (パス TEXT PRIMARY KEY, 更新時刻 INTEGER NOT NULL, サイズ INTEGER NOT NULL, 理由 TEXT NOT NULL)")
+    return conn
+
+# 1日分の行を置き換え、元のExcelファイルの識別情報を記録（コミットは呼び出し側）
+def insert_day(conn, kind, date, df, source_path, signature=None):
+    names = column_names(kind)
+    frame = df.reindex(columns=names)
+    rows = frame.astype(object).where(frame.notna(), None)
+    placeholders = ", ".join("?" for _ in range(len(names) + 2))
+    mtime, size = signature or file_signature(source_path)
+    conn.execute(f"DELETE FROM {quote(kind)} WHERE 日付 = ?", (date,))
+    conn.executemany(
+        f"INSERT INTO {quote(kind)} (日付, 行番号, {', '.join(map(quote, names))}) VALUES ({placeholders})",
+        ((date, i, *row) for i, row in enumerate(rows.itertuples(index=False, name=None))))
+    conn.execute("INSERT OR REPLACE INTO ソースファイル VALUES (?, ?, ?, ?, ?)",
+                 (cache_key(source_path), kind, date, mtime, size))
+
+# 1日分の行を置き換えて保存
+def write_day(kind, date, df, source_path, store_path=DATA_STORE_PATH):
+    signature = file_signature(source_path)
+    with span("store:write_day", path=source_path, rows=len(df)), closing(connect(store_path)) as conn, conn:
+        insert_day(conn, kind, date, df, source_path, signature)
+    remember(source_path, signature, df)
+
+# Excel保存後にストアへ反映（ストアは補助なので失敗しても保存自体は成功扱い）
+def write_day_quietly(kind, date, df, source_path, store_path=DATA_STORE_PATH):
+    try:
+        write_day(kind, date, df, source_path, store_path)
+    except (sqlite3.Error, OSError):
+        # ローカル保存先を作成できない場合なども含め、次回読み込み時に識別情報が一致せず、Excelから再作成される
+        pass
+
+# 1日分の保存（入力した行をジャーナルへ追記、operation は ジャーナル.OPERATIONS のいずれか）
+# Excelファイルの作り直しは needs_compaction の場合のみ（他の端末が使用中などで反映できなければ次の機会に反映）
+# 圧縮しなかった場合、ストアとメモリの内容は識別情報が一致しなくなるため、次の読み込みでジャーナルを含めて作り直される
+def save_day(kind, operation, file_path, date, df, store_path=DATA_STORE_PATH):
+    with span(f"save:{kind}", path=file_path, operation=operation) as fields:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        append_entry(file_path, operation, df)
+        fields["rows"] = len(df)
+        if not needs_compaction(file_path):
+            return file_path
+        compacted = compact_day(kind, file_path, wait=False)
+        fields["compacted"] = compacted is not None
+        if compacted is not None:
+            write_day_quietly(kind, date, compacted, file_path, store_path)
+        return file_path
+
+# ストアから読み込み（Excelファイルが保存時から変更されている場合は None）
+def read_day(kind, source_path, store_path=DATA_STORE_PATH):
+    with closing(connect(store_path)) as conn:
+        record = conn.execute("SELECT 日付, 更新時刻, サイズ FROM ソースファイル WHERE パス = ? AND 種別 = ?",
+                              (cache_key(source_path), kind)).fetchone()
+        if record is None or list(record[1:]) != file_signature(source_path):
+            return None
+        names = column_names(kind)
+        df = pd.read_sql_query(
+            f"SELECT {', '.join(map(quote, names))} FROM {quote(kind)} WHERE 日付 = ? ORDER BY 行番号",
+            conn, params=(record[0],))
+    return apply_schema(df, DAILY_SCHEMAS[kind]["columns"])
+
+# 日次ファイルの読み込み（メモリ、ストアの順に優先し、なければExcelとジャーナルから読み込んでストアを更新）
+# columns を指定した場合はその列のみ（Excelからはその列だけを読み込み、全ての列がそろわないためストアは更新しない）
+def read_workbook(kind, file_path, date=None, store_path=DATA_STORE_PATH, columns=None):
+    with span("io:read_workbook", path=file_path) as fields:
+        signature = file_signature(file_path)
+        df = recall(file_path, signature)
+        if df is not None:
+            fields.update(source="memory", rows=len(df))
+            return df if columns is None else df[columns]
+
+        try:
+            with span("store:read_day", path=file_path):
+                df = read_day(kind, file_path, store_path)
+        except sqlite3.Error:
+            df = None
+        if df is not None:
+            fields.update(source="store", rows=len(df))
+            remember(file_path, signature, df)
+            return df if columns is None else df[columns]
+
+        with span("io:read_excel", path=file_path) as excel_fields:
+            df = read_day_frame(kind, file_path, columns)
+            excel_fields["rows"] = len(df)
+        fields.update(source="excel", rows=len(df))
+        if columns is not None:
+            return df
+        date = date or parse_date(kind, file_path)
+        if date is not None and set(column_names(kind)) <= set(df.columns):
+            write_day_quietly(kind, date, df, file_path, store_path)
+        else:
+            remember(file_path, signature, df)
+        return df
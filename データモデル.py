@@ -0,0 +1,56 @@
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+from スキーマ import RATE_COLUMNS
+
+# DataFrameを直接参照する表示用モデル
+# セルは表示される時に data() で文字列化し、行は FETCH_SIZE 行ずつ段階的にビューへ公開する
+class DataFrameTableModel(QAbstractTableModel):
+    FETCH_SIZE = 256
+
+    def __init__(self, df, parent=None):
+        super().__init__(parent)
+        self.set_dataframe(df)
+
+    def set_dataframe(self, df):
+        self.beginResetModel()
+        self.df = df
+        self.headers = [str(column) for column in df.columns]
+        # 率の列は数値で保持しているため、表示時に % を付ける
+        self.rate_columns = {i for i, header in enumerate(self.headers) if header in RATE_COLUMNS}
+        # 列ごとの配列を保持（セルごとのオブジェクトは作らない）
+        self.columns = [df.iloc[:, i].to_numpy() for i in range(len(df.columns))]
+        self.loaded_rows = min(len(df), self.FETCH_SIZE)
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.loaded_rows
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        value = self.columns[index.column()][index.row()]
+        if index.column() in self.rate_columns and isinstance(value, float) and value == value:
+            return f"{value:.2f}%"
+        return str(value)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.headers[section]
+        return str(section + 1)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.loaded_rows < len(self.df)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        count = min(self.FETCH_SIZE, len(self.df) - self.loaded_rows)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self.loaded_rows, self.loaded_rows + count - 1)
+        self.loaded_rows += count
+        self.endInsertRows()
@@ -0,0 +1,289 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+
+# 処理時間の計測（python -m ベンチマーク）
+# 合成した営業所のデータ（社員数 × 1か月の日数 × 年数）を作業フォルダに作成し、主な処理の時間をJSONに出力する
+# キャッシュとデータストアは作業フォルダ内に作るため、実際のデータには触れない
+
+PACKAGE_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+# 基準値は計測した端末でのみ意味を持つため、端末ごとに --save-baseline で作成する（バージョン管理には含めない）
+DEFAULT_BASELINE_PATH = os.path.join(PACKAGE_DIRECTORY, "ベンチマーク基準.json")
+
+# 計測する処理（run_benchmarks の結果の名前、起動時間は STARTUP_WINDOWS から）
+BENCHMARK_NAMES = [
+    "monthly_aggregation_cold",
+    "monthly_aggregation_warm",
+    "yearly_aggregation_cold",
+    "yearly_aggregation_warm",
+    "yearly_aggregation_rescan_warm",
+    "fulfillment_upsert",
+    "fulfillment_save_day",
+    "journal_append",
+    "view_existing_data_model",
+    "view_model_year_rows",
+    "kpi_rolling_year",
+    "kpi_update_day",
+]
+
+# 起動時間を計測する画面（モジュール, ウィンドウのクラス）
+STARTUP_WINDOWS = [
+    ("月次年次集計", "MainWindow"),
+    ("誤配管理", "AttendanceApp"),
+    ("佐川急便管理システム", "SagawaManagementSystem"),
+]
+
+# 起動時間の上限（Pythonの起動から最初の描画まで）
+STARTUP_BUDGET_SECONDS = 2.0
+
+# 別プロセスで画面を表示するまでの時間を計測するスクリプト（ダイアログは表示せずに閉じる）
+STARTUP_SCRIPT = """
+import sys, json
+from PyQt5.QtWidgets import QApplication, QMessageBox
+for name in ("information", "warning", "critical"):
+    setattr(QMessageBox, name, staticmethod(lambda *args: None))
+app = QApplication(sys.argv)
+module = __import__(sys.argv[1])
+window = getattr(module, sys.argv[2])()
+window.show()
+app.processEvents()
+print(json.dumps({"pandas_loaded": "pandas" in sys.modules}))
+"""
+
+# 合成データの作成（誤配管理は 年/月 フォルダ、履行率管理はファイル名に年がないため年ごとのフォルダ）
+def generate_depot(work_directory, drivers, days, years, start_year=2024, seed=0):
+    from 誤配処理 import build_misdelivery_frame, misdelivery_file_path
+    from 履行率処理 import build_fulfillment_frame, fulfillment_file_path
+    from Excel出力 import write_excel_atomic
+
+    rng = random.Random(seed)
+    names = [f"社員{i + 1:03d}" for i in range(drivers)]
+    misdelivery_directory = os.path.join(work_directory, "誤配管理")
+    fulfillment_directory = os.path.join(work_directory, "佐川急便管理")
+
+    for year in range(start_year, start_year + years):
+        year_fulfillment_directory = os.path.join(fulfillment_directory, str(year))
+        os.makedirs(year_fulfillment_directory, exist_ok=True)
+        for month in range(1, 13):
+            month_directory = os.path.join(misdelivery_directory, str(year), f"{month:02d}")
+            os.makedirs(month_directory, exist_ok=True)
+            for day in range(1, min(days, 28) + 1):
+                # 誤配管理.InputWindow.save_data と同じ列・書式
+                rows = []
+                for name in names:
+                    morning, afternoon = rng.randint(20, 120), rng.randint(20, 120)
+                    rows.append((name, morning, afternoon, rng.choices([0, 0, 0, 1, 2], k=1)[0]))
+                file_path = misdelivery_file_path(misdelivery_directory, str(year), f"{month:02d}", f"{day:02d}")
+                write_excel_atomic(build_misdelivery_frame(rows), file_path, column_width=20)
+
+                # 佐川急便管理システム.SagawaManagementSystem.save_data と同じ列・書式
+                data = []
+                for name in names:
+                    total = rng.randint(40, 240)
+                    data.append([name, total, rng.randint(0, 3), rng.randint(0, 1), rng.randint(0, 2), rng.randint(0, 1), 0])
+                file_path = fulfillment_file_path(f"{month:02d}", f"{day:02d}", year_fulfillment_directory)
+                write_excel_atomic(build_fulfillment_frame(data), file_path)
+
+    return misdelivery_directory, fulfillment_directory
+
+# 関数を repeat 回実行した時間（setup は計測に含めない）
+def measure(function, repeat, setup=None):
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return {"min": min(timings), "median": statistics.median(timings), "repeat": repeat}
+
+# キャッシュとデータストアを削除（初回実行の状態に戻す）
+def clear_local_data():
+    from 設定 import SUMMARY_CACHE_PATH, DATA_STORE_PATH
+    from データストア import clear_memory
+    clear_memory()
+    for path in (SUMMARY_CACHE_PATH, DATA_STORE_PATH, f"{DATA_STORE_PATH}-wal", f"{DATA_STORE_PATH}-shm"):
+        if os.path.exists(path):
+            os.remove(path)
+
+# 各処理の計測
+def run_benchmarks(misdelivery_directory, fulfillment_directory, start_year, repeat):
+    import pandas as pd
+    import 集計処理
+    from データストア import read_workbook
+    from 履行率処理 import upsert_fulfillment, save_fulfillment_day, build_fulfillment_frame
+    from ジャーナル import append_entry, journal_path
+    from データモデル import DataFrameTableModel
+    from 移動集計 import RollingKPI
+    from PyQt5.QtCore import QCoreApplication
+
+    app = QCoreApplication.instance() or QCoreApplication([])
+    year = str(start_year)
+    results = {}
+
+    # 月次・年次集計（キャッシュなし / キャッシュあり、年次は月次集計の積み上げと日次ファイルの再集計）
+    results["monthly_aggregation_cold"] = measure(
+        lambda: 集計処理.monthly_aggregation(misdelivery_directory, year, "01"), repeat, setup=clear_local_data)
+    results["monthly_aggregation_warm"] = measure(
+        lambda: 集計処理.monthly_aggregation(misdelivery_directory, year, "01"), repeat)
+    results["yearly_aggregation_cold"] = measure(
+        lambda: 集計処理.yearly_aggregation(misdelivery_directory, year), repeat, setup=clear_local_data)
+    results["yearly_aggregation_warm"] = measure(
+        lambda: 集計処理.yearly_aggregation(misdelivery_directory, year), repeat)
+    results["yearly_aggregation_rescan_warm"] = measure(
+        lambda: 集計処理.yearly_aggregation(misdelivery_directory, year, rollup=False), repeat)
+
+    # 履行率の反映（既存の半分を更新し、同じ人数を新しく追加）
+    file_path = os.path.join(fulfillment_directory, year, "履行率管理_01_01.xlsx")
+    existing_df = pd.read_excel(file_path)
+    names = list(existing_df['社員名'])
+    update = [[name, 100, 1, 0, 0, 0, 0] for name in names[::2]]
+    update += [[f"追加{i + 1:03d}", 100, 1, 0, 0, 0, 0] for i in range(len(names))]
+    df = build_fulfillment_frame(update)
+    results["fulfillment_upsert"] = measure(lambda: upsert_fulfillment(existing_df, df), repeat)
+
+    backup_path = f"{file_path}.bak"
+    shutil.copyfile(file_path, backup_path)
+    results["fulfillment_save_day"] = measure(
+        lambda: save_fulfillment_day(file_path, f"{year}-01-01", df), repeat,
+        setup=lambda: shutil.copyfile(backup_path, file_path))
+
+    # ジャーナルへの追記のみ（保存のうち、他の端末の保存と競合する部分）
+    def remove_journal():
+        if os.path.exists(journal_path(file_path)):
+            os.remove(journal_path(file_path))
+    results["journal_append"] = measure(lambda: append_entry(file_path, "反映", df), repeat, setup=remove_journal)
+    remove_journal()
+
+    # 既存データ表示用のモデル作成（1日分と1年分）
+    day_path = os.path.join(misdelivery_directory, year, "01", f"誤配管理_{year}_01_01.xlsx")
+    results["view_existing_data_model"] = measure(
+        lambda: DataFrameTableModel(read_workbook("誤配管理", day_path)), repeat)
+    year_df = pd.concat([read_workbook("誤配管理", path) for path in 集計処理.list_year_files(misdelivery_directory, year)],
+                        ignore_index=True)
+    results["view_model_year_rows"] = measure(lambda: DataFrameTableModel(year_df), repeat)
+
+    # 1年分の移動集計（上で読み込んだ日次ファイルはストアに登録済み）と、保存された1日分での更新
+    engine = RollingKPI(f"{year}-01-01", f"{year}-12-31")
+    results["kpi_rolling_year"] = measure(lambda: engine.load(refresh=False).frame(), repeat)
+    day_df = read_workbook("誤配管理", day_path)
+    results["kpi_update_day"] = measure(lambda: engine.update_day("誤配管理", f"{year}-01-01", day_df), repeat)
+
+    del app
+    return results
+
+# 画面が表示されるまでの時間（プロセスの起動から、pandas を読み込まずに表示できたかも記録）
+def measure_startup(module_name, class_name, repeat):
+    environment = {**os.environ, "QT_QPA_PLATFORM": os.environ.get("QT_QPA_PLATFORM", "offscreen")}
+    timings = []
+    pandas_loaded = False
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT, module_name, class_name], cwd=PACKAGE_DIRECTORY,
+                                env=environment, capture_output=True, text=True, check=True).stdout
+        timings.append(time.perf_counter() - start)
+        pandas_loaded = pandas_loaded or json.loads(output.strip().splitlines()[-1])["pandas_loaded"]
+    return {"min": min(timings), "median": statistics.median(timings), "repeat": repeat, "pandas_loaded": pandas_loaded}
+
+# 各画面の起動時間と上限の確認（上限を超えたもの、表示前に pandas を読み込んだものを返す）
+def run_startup_benchmarks(repeat, budget):
+    results = {}
+    exceeded = []
+    for module_name, class_name in STARTUP_WINDOWS:
+        name = f"startup_{module_name}"
+        results[name] = measure_startup(module_name, class_name, repeat)
+        if results[name]["min"] > budget or results[name]["pandas_loaded"]:
+            exceeded.append(name)
+    return results, exceeded
+
+# 基準値との比較（最短時間の比率が tolerance を超えたものを遅くなったとする、最短時間は他の処理の影響を受けにくい）
+# 基準値にない処理は baseline を None として含める（基準値を作り直す必要があることが分かるように）
+def compare_with_baseline(results, baseline, tolerance):
+    comparison = {}
+    for name in [*BENCHMARK_NAMES, *(f"startup_{module_name}" for module_name, _ in STARTUP_WINDOWS)]:
+        if name not in results:
+            continue
+        result = results[name]
+        if name not in baseline.get("results", {}):
+            comparison[name] = {"baseline": None, "min": result["min"], "ratio": None, "regressed": False}
+            continue
+        base = baseline["results"][name]["min"]
+        ratio = result["min"] / base if base > 0 else None
+        comparison[name] = {"baseline": base, "min": result["min"], "ratio": ratio,
+                            "regressed": ratio is not None and ratio > tolerance}
+    return comparison
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m ベンチマーク", description="合成データで主な処理の時間を計測します。")
+    parser.add_argument("--drivers", type=int, default=40, help="社員数")
+    parser.add_argument("--days", type=int, default=20, help="1か月あたりの日数（最大28）")
+    parser.add_argument("--years", type=int, default=1, help="年数")
+    parser.add_argument("--start-year", type=int, default=2024, help="最初の年")
+    parser.add_argument("--repeat", type=int, default=5, help="各処理の実行回数")
+    parser.add_argument("--seed", type=int, default=0, help="乱数のシード")
+    parser.add_argument("--work", help="作業フォルダ（省略時は一時フォルダを作成し、終了後に削除）")
+    parser.add_argument("--output", help="結果のJSONファイル（省略時は標準出力）")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH, help="比較する基準値のJSONファイル")
+    parser.add_argument("--save-baseline", action="store_true", help="結果を基準値として保存")
+    parser.add_argument("--startup-budget", type=float, default=STARTUP_BUDGET_SECONDS, help="画面の起動時間の上限（秒）")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="基準値の何倍を超えたら遅くなったとするか")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    work_directory = args.work or tempfile.mkdtemp(prefix="ベンチマーク_")
+
+    # 設定の読み込み前にキャッシュとデータストアの場所を作業フォルダへ切り替える
+    os.environ["SAGAWA_LOCAL_DATA_DIR"] = os.path.join(work_directory, "ローカル")
+    try:
+        misdelivery_directory, fulfillment_directory = generate_depot(
+            work_directory, args.drivers, args.days, args.years, args.start_year, args.seed)
+        results = run_benchmarks(misdelivery_directory, fulfillment_directory, args.start_year, args.repeat)
+        startup_results, startup_exceeded = run_startup_benchmarks(args.repeat, args.startup_budget)
+        results.update(startup_results)
+    finally:
+        if not args.work:
+            shutil.rmtree(work_directory, ignore_errors=True)
+
+    import pandas as pd
+    report = {
+        "parameters": {"drivers": args.drivers, "days": args.days, "years": args.years, "repeat": args.repeat},
+        "environment": {"python": platform.python_version(), "pandas": pd.__version__, "platform": platform.platform()},
+        "results": results,
+        "startup_budget": {"seconds": args.startup_budget, "exceeded": startup_exceeded},
+    }
+
+    exit_code = 1 if startup_exceeded else 0
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+        # 条件が異なる基準値とは比較しない
+        if baseline.get("parameters") == report["parameters"]:
+            report["comparison"] = compare_with_baseline(results, baseline, args.tolerance)
+            if any(item["regressed"] for item in report["comparison"].values()):
+                exit_code = 1
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            file.write(json.dumps({key: report[key] for key in ("parameters", "environment", "results")},
+                                  ensure_ascii=False, indent=2) + "\n")
+    return exit_code
+
+if __name__ == '__main__':
+    sys.exit(main())
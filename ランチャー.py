@@ -0,0 +1,76 @@
+import sys
+import importlib
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QFont
+from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QLabel, QPushButton
+from 遅延読込 import preload_after_show
+
+# 3つのツールを1つのプロセスで起動するランチャー
+# 社員名簿、集計キャッシュ、読み込んだ日次データはプロセス内で共有されるため、入力から集計に切り替えても読み直さない
+
+# ランチャーから開くツール（ボタンの表示名, モジュール, ウィンドウのクラス）
+TOOLS = [
+    ("履行率管理", "佐川急便管理システム", "SagawaManagementSystem"),
+    ("誤配管理", "誤配管理", "AttendanceApp"),
+    ("誤配管理集計", "月次年次集計", "MainWindow"),
+]
+
+# 先読みする処理モジュール（全てのツールで使うもの）
+PRELOAD_MODULES = ["集計処理", "誤配処理", "履行率処理", "社員履歴"]
+
+class LauncherWindow(QWidget):
+    def __init__(self):
+        super().__init__()
+        self.windows = {}
+        self.init_ui()
+
+    def init_ui(self):
+        layout = QVBoxLayout()
+        self.font = QFont("Arial", 12)
+
+        label = QLabel("使用するツールを選択してください。")
+        label.setFont(self.font)
+        layout.addWidget(label)
+
+        for title, module_name, class_name in TOOLS:
+            button = QPushButton(title)
+            button.setFont(self.font)
+            button.clicked.connect(lambda _, title=title, module_name=module_name, class_name=class_name:
+                                   self.open_tool(title, module_name, class_name))
+            layout.addWidget(button)
+
+        self.setLayout(layout)
+        self.setWindowTitle('佐川急便管理ランチャー')
+        self.adjustSize()
+
+    # ツールのウィンドウを開く（開いている場合は前面に表示、閉じられていれば新しく作成）
+    def open_tool(self, title, module_name, class_name):
+        window = self.windows.get(title)
+        if window is None or not window.isVisible():
+            module = importlib.import_module(module_name)
+            window = getattr(module, class_name)()
+            self.windows[title] = window
+        window.show()
+        window.setWindowState(window.windowState() & ~Qt.WindowMinimized)
+        window.raise_()
+        window.activateWindow()
+
+    # ランチャーを閉じる時は開いているツールも閉じる（閉じるのを取り消されたツールがあれば終了しない）
+    def closeEvent(self, event):
+        for window in self.windows.values():
+            if window.isVisible():
+                window.close()
+        if any(window.isVisible() for window in self.windows.values()):
+            event.ignore()
+        else:
+            event.accept()
+
+# アプリケーションのエントリーポイント
+if __name__ == '__main__':
+    app = QApplication(sys.argv)
+    # 常駐中は各ツールの保存後にアプリケーションを終了しない
+    app.setProperty("resident", True)
+    launcher = LauncherWindow()
+    launcher.show()
+    preload_after_show(*PRELOAD_MODULES)
+    sys.exit(app.exec_())
@@ -0,0 +1,135 @@
+import os
+import re
+import time
+from datetime import datetime
+from contextlib import closing
+from 設定 import DATA_STORE_PATH
+from 並列読込 import iter_workbooks
+from データストア import (FILENAME_PATTERNS, LAYOUTS, cache_key, column_names, connect, file_signature,
+                     insert_day, parse_date, write_day_quietly)
+from ジャーナル import compact_day, find_journals, read_day_frame, with_journal_days
+
+# 年フォルダの名前（例: 2024）
+YEAR_FOLDER_PATTERN = re.compile(r"^\d{4}$")
+
+# フォルダ以下の日次ファイルを列挙（種別, パス、ジャーナルだけがある日も含む）
+def find_daily_files(root):
+    for directory, folders, filenames in os.walk(root):
+        folders.sort()
+        for filename in sorted(with_journal_days(filenames)):
+            for kind, pattern in FILENAME_PATTERNS.items():
+                if pattern.match(filename):
+                    yield kind, os.path.join(directory, filename)
+
+# ファイルの日付（ファイル名に年がない場合は、親フォルダの年・指定された年・更新日時の年の順で補完）
+def resolve_date(kind, file_path, default_year=None):
+    date = parse_date(kind, file_path)
+    if date is not None:
+        return date
+    folders = os.path.normpath(os.path.dirname(os.path.abspath(file_path))).split(os.sep)
+    year = next((folder for folder in reversed(folders) if YEAR_FOLDER_PATTERN.match(folder)), None)
+    year = year or default_year or datetime.fromtimestamp(os.path.getmtime(file_path)).year
+    return parse_date(kind, file_path, year)
+
+# 列構成の検証（save_data が書き出す列構成と一致すること）、問題があれば理由を返す
+# 数値の列の値は読み込み時に検証する（read_day_frame の strict）
+def validate_layout(kind, df):
+    expected = column_names(kind)
+    missing = [column for column in expected if column not in df.columns]
+    if missing:
+        return f"列が不足しています: {', '.join(missing)}"
+    unexpected = [str(column) for column in df.columns if column not in expected]
+    if unexpected:
+        return f"想定外の列があります: {', '.join(unexpected)}"
+
+    employee_column = LAYOUTS[kind]["employee_column"]
+    if df[employee_column].isna().any():
+        return f"{employee_column}が空欄の行があります"
+    return None
+
+# 1ファイル分の読み込みと検証（プロセスプールで実行）、(DataFrame, エラー理由) を返す
+def load_daily_file(task):
+    kind, file_path = task
+    try:
+        df = read_day_frame(kind, file_path, strict=True)
+    except Exception as e:
+        return None, f"読み込みに失敗しました: {e}"
+    error = validate_layout(kind, df)
+    return (None, error) if error else (df, None)
+
+# 取込済み・検証済みのファイルの識別情報（中断後の再開に使用）
+def load_checkpoint(conn):
+    checkpoint = {}
+    for table in ("ソースファイル", "取込エラー"):
+        for path, mtime, size in conn.execute(f"SELECT パス, 更新時刻, サイズ FROM {table}"):
+            checkpoint[path] = [mtime, size]
+    return checkpoint
+
+# 進捗（処理件数と処理速度）
+def import_stats(stats, started):
+    elapsed = max(time.monotonic() - started, 1e-9)
+    return {**stats, "seconds": round(elapsed, 2),
+            "files_per_sec": round((stats["files"] + stats["invalid"]) / elapsed, 1),
+            "rows_per_sec": round(stats["rows"] / elapsed, 1)}
+
+# フォルダ以下の日次ファイルを並列に読み込んでストアへ取り込み
+# 取込済みで変更のないファイルは飛ばし、batch_size 件ごとにコミットするため中断しても続きから再開できる
+def import_directory(root, default_year=None, jobs=None, executor="process", batch_size=200,
+                     progress=None, progress_interval=2.0, on_invalid=None, store_path=DATA_STORE_PATH):
+    started = time.monotonic()
+    stats = {"found": 0, "skipped": 0, "files": 0, "rows": 0, "invalid": 0}
+
+    with closing(connect(store_path)) as conn:
+        checkpoint = load_checkpoint(conn)
+        tasks = []
+        for kind, file_path in find_daily_files(root):
+            stats["found"] += 1
+            signature = file_signature(file_path)
+            if checkpoint.get(cache_key(file_path)) == signature:
+                stats["skipped"] += 1
+            else:
+                tasks.append((kind, file_path, signature))
+
+        results = iter_workbooks([(kind, file_path) for kind, file_path, _ in tasks],
+                                 reader=load_daily_file, jobs=jobs, executor=executor)
+        last_report = time.monotonic()
+        for count, ((kind, file_path, signature), (df, error)) in enumerate(zip(tasks, results), 1):
+            if error:
+                conn.execute("INSERT OR REPLACE INTO 取込エラー VALUES (?, ?, ?, ?)", (cache_key(file_path), *signature, error))
+                stats["invalid"] += 1
+                if on_invalid:
+                    on_invalid(file_path, error)
+            else:
+                insert_day(conn, kind, resolve_date(kind, file_path, default_year), df, file_path, signature)
+                conn.execute("DELETE FROM 取込エラー WHERE パス = ?", (cache_key(file_path),))
+                stats["files"] += 1
+                stats["rows"] += len(df)
+
+            if count % batch_size == 0:
+                conn.commit()
+            if progress and time.monotonic() - last_report >= progress_interval:
+                progress(import_stats(stats, started))
+                last_report = time.monotonic()
+        conn.commit()
+
+    return import_stats(stats, started)
+
+# フォルダ以下の追記ジャーナルをExcelファイルへ反映（圧縮）し、ストアも更新
+# 他の端末が保存中のファイルはロックが外れるまで待つ
+def compact_directory(root, default_year=None, on_compacted=None, store_path=DATA_STORE_PATH):
+    stats = {"files": 0, "rows": 0}
+    for file_path in find_journals(root):
+        kind = next((kind for kind, pattern in FILENAME_PATTERNS.items() if pattern.match(os.path.basename(file_path))), None)
+        if kind is None:
+            continue
+        df = compact_day(kind, file_path)
+        if df is None:
+            continue
+        date = resolve_date(kind, file_path, default_year)
+        if date is not None:
+            write_day_quietly(kind, date, df, file_path, store_path)
+        stats["files"] += 1
+        stats["rows"] += len(df)
+        if on_compacted:
+            on_compacted(file_path, len(df))
+    return stats
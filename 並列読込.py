@@ -0,0 +1,32 @@
+import pandas as pd
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import 計測
+
+# 読み込みに使用するワーカーの種類
+EXECUTORS = {
+    "thread": ThreadPoolExecutor,
+    "process": ProcessPoolExecutor,
+}
+
+# 複数のExcelファイルを並列に読み込み、読み込んだ順に結果を返す（順序は file_paths と同じ）
+# reader はプロセスプールでも使えるようにモジュールレベルの関数を渡すこと
+def iter_workbooks(file_paths, reader=pd.read_excel, jobs=None, executor="thread"):
+    file_paths = list(file_paths)
+    if executor not in EXECUTORS:
+        raise ValueError(f"不明なワーカー種別です: {executor}")
+    if jobs == 1 or len(file_paths) <= 1:
+        yield from map(reader, file_paths)
+        return
+    with EXECUTORS[executor](max_workers=jobs) as pool:
+        if executor == "process" and 計測.enabled():
+            # 子プロセスで記録した区間を親プロセスのトレースへまとめる
+            for result, events in pool.map(partial(計測.call_traced, reader, 計測.trace_path()), file_paths):
+                計測.record(*events)
+                yield result
+            return
+        yield from pool.map(reader, file_paths)
+
+# 複数のExcelファイルを並列に読み込み（結果は file_paths と同じ順序のリスト）
+def read_workbooks(file_paths, reader=pd.read_excel, jobs=None, executor="thread"):
+    return list(iter_workbooks(file_paths, reader, jobs, executor))
@@ -1,7 +1,16 @@
 from PyQt5 import QtWidgets, QtGui
-import pandas as pd
-import os
 from datetime import datetime
+from スキーマ import FULFILLMENT_INPUT_COLUMNS
+from 遅延読込 import lazy_module, preload_after_show
+from 保存ワーカー import start_save, save_error_message
+from 入力グリッド import EntryGrid
+from 社員名簿 import get_roster
+from 設定 import FULFILLMENT_EMPLOYEE_LIST_PATH
+from 計測 import span
+
+# 履行率の計算と保存（pandas を含むため、最初に使う時か画面の表示後に読み込む）
+履行率処理 = lazy_module("履行率処理")
+ジャーナル = lazy_module("ジャーナル")
 
 class SagawaManagementSystem(QtWidgets.QMainWindow):
     def __init__(self):
@@ -74,10 +83,11 @@ class SagawaManagementSystem(QtWidgets.QMainWindow):
         self.employee_count_layout.addWidget(self.employee_count_input)
         self.main_layout.addLayout(self.employee_count_layout)
 
-        # データ入力エリア
-        self.data_area = QtWidgets.QWidget(self)
-        self.data_layout = QtWidgets.QGridLayout(self.data_area)
-        self.main_layout.addWidget(self.data_area)
+        # データ入力エリア（1行が社員1人分の入力表）
+        self.roster = get_roster(FULFILLMENT_EMPLOYEE_LIST_PATH)
+        self.entry_grid = EntryGrid(FULFILLMENT_INPUT_COLUMNS, self)
+        self.entry_grid.set_employee_model(self.roster.list_model())
+        self.main_layout.addWidget(self.entry_grid)
 
         # 保存ボタン
         self.submit_button = QtWidgets.QPushButton("データ保存")
@@ -113,8 +123,10 @@ class SagawaManagementSystem(QtWidgets.QMainWindow):
         date = f"{year}-{month}-{day}"
 
         # ファイルの存在を確認
-        file_path = f"C:/Users/Owner/OneDrive/デスクトップ/佐川急便管理/履行率管理_{month}_{day}.xlsx"
-        if os.path.exists(file_path):
+        file_path = 履行率処理.fulfillment_file_path(month, day)
+        with span("io:exists", path=file_path):
+            exists = ジャーナル.day_exists(file_path)
+        if exists:
             # ファイルが存在する場合は修正と追記ボタンを表示
             self.modify_button.setVisible(True)
             self.append_button.setVisible(True)
@@ -135,12 +147,10 @@ class SagawaManagementSystem(QtWidgets.QMainWindow):
         # データ追記機能の実装はここに追加
 
     def load_employee_names(self):
-        file_path = r"C:\Users\Owner\OneDrive\デスクトップ\佐川急便管理\社員名.txt"
-        if os.path.exists(file_path):
-            with open(file_path, "r", encoding="utf-8") as file:
-                names = [line.strip() for line in file.readlines()]
-            return names
-        else:
+        # 社員名簿は共有され、ファイルが更新された時だけ読み直される
+        try:
+            return self.roster.get_names()
+        except FileNotFoundError:
             QtWidgets.QMessageBox.warning(self, "ファイルエラー", "社員名ファイルが見つかりません。")
             return []
 
@@ -148,88 +158,45 @@ class SagawaManagementSystem(QtWidgets.QMainWindow):
         if not self.employee_count_input.text().isdigit():
             return
 
-        count = int(self.employee_count_input.text())
-        employee_names = self.load_employee_names()
-        # レイアウト内の既存ウィジェットをクリア
-        for i in reversed(range(self.data_layout.count())): 
-            self.data_layout.itemAt(i).widget().setParent(None)
-        
-        # 各社員の入力フィールドを追加
-        self.employee_fields = []
-        for i in range(count):
-            row = []
-            labels = ["社員名", "持ち出し総数", "不履行数", "クレーム", "誤配", "遅刻", "事故"]
-            for j, label in enumerate(labels):
-                lbl = QtWidgets.QLabel(label)
-                if j == 0:
-                    input_field = QtWidgets.QComboBox()  # 社員名にはコンボボックスを使用
-                    input_field.addItems(employee_names)
-                else:
-                    input_field = QtWidgets.QLineEdit()
-                    input_field.setText("0")  # デフォルト値は0
-                self.data_layout.addWidget(lbl, i, j * 2)
-                self.data_layout.addWidget(input_field, i, j * 2 + 1)
-                row.append(input_field)
-            self.employee_fields.append(row)
-        
-        # 新しいコンテンツに基づいてウィンドウサイズを調整
-        self.adjustSize()
+        # 社員名簿が更新されていれば読み直し（全ての社員名欄に反映）
+        self.load_employee_names()
+
+        # 入力が落ち着いてから、増減した行だけを追加・削除
+        self.entry_grid.request_row_count(int(self.employee_count_input.text()))
 
     def save_data(self):
         year = self.year_input.currentText()
         month = self.month_input.currentText()
         day = self.day_input.currentText()
         date = f"{year}-{month}-{day}"
-        count = int(self.employee_count_input.text())
-        data = []
-
-        for fields in self.employee_fields:
-            employee_data = [field.currentText() if isinstance(field, QtWidgets.QComboBox) else field.text() for field in fields]
-            data.append(employee_data)
-
-        columns = ["社員名", "持ち出し総数", "不履行数", "クレーム", "誤配", "遅刻", "事故"]
-        df = pd.DataFrame(data, columns=columns)
+        data = self.entry_grid.row_values()
+        if not data:
+            QtWidgets.QMessageBox.warning(self, "入力エラー", "出勤人数を入力してください。")
+            return
 
-        # 履行率を計算（小数点第2位まで）
-        df['履行率'] = df.apply(lambda row: round((int(row['持ち出し総数']) - int(row['不履行数'])) / int(row['持ち出し総数']) * 100, 2) 
-                                if int(row['持ち出し総数']) > 0 else 0, axis=1)
+        # 数値への変換と履行率の計算（小数点第2位まで）
+        with span("pandas:build_fulfillment_frame", rows=len(data)):
+            df = 履行率処理.build_fulfillment_frame(data)
 
         # 全体平均履行率を計算
         average_fulfillment_rate = df['履行率'].mean()
 
-        file_path = f"C:/Users/Owner/OneDrive/デスクトップ/佐川急便管理/履行率管理_{month}_{day}.xlsx"
-        if os.path.exists(file_path):
-            existing_df = pd.read_excel(file_path)
-            existing_employee_names = existing_df['社員名'].tolist()
-
-            for _, row in df.iterrows():
-                employee_name = row['社員名']
-                if employee_name in existing_employee_names:
-                    existing_df.loc[existing_df['社員名'] == employee_name, df.columns] = row
-                else:
-                    existing_df = pd.concat([existing_df, row.to_frame().T], ignore_index=True)
-
-            # 上書き保存
-            with pd.ExcelWriter(file_path, engine='xlsxwriter') as writer:
-                existing_df.to_excel(writer, index=False)
-                # 列幅調整
-                for column in existing_df:
-                    column_width = max(existing_df[column].astype(str).map(len).max(), len(column))
-                    col_idx = existing_df.columns.get_loc(column)
-                    writer.sheets['Sheet1'].set_column(col_idx, col_idx, column_width)
-        else:
-            # 新規保存
-            with pd.ExcelWriter(file_path, engine='xlsxwriter') as writer:
-                df.to_excel(writer, index=False)
-                # 列幅調整
-                for column in df:
-                    column_width = max(df[column].astype(str).map(len).max(), len(column))
-                    col_idx = df.columns.get_loc(column)
-                    writer.sheets['Sheet1'].set_column(col_idx, col_idx, column_width)
+        # 既存データへの反映とExcelへの書き込みはバックグラウンドで実行
+        file_path = 履行率処理.fulfillment_file_path(month, day)
+        self.submit_button.setEnabled(False)
+        start_save(self, 履行率処理.save_fulfillment_day, file_path, date, df,
+                   on_finished=lambda _: self.on_save_finished(date, average_fulfillment_rate),
+                   on_failed=self.on_save_failed)
 
+    def on_save_finished(self, date, average_fulfillment_rate):
+        self.submit_button.setEnabled(True)
         QtWidgets.QMessageBox.information(self, "保存完了", f"{date}のデータが正常に保存されました。\n全体平均履行率: {average_fulfillment_rate:.2f}%")
         self.close()
 
+    def on_save_failed(self, error):
+        self.submit_button.setEnabled(True)
+        QtWidgets.QMessageBox.critical(self, "保存エラー", save_error_message(error))
+
     def closeEvent(self, event):
         reply = QtWidgets.QMessageBox.question(self, '終了', '本当に終了しますか?', QtWidgets.QMessageBox.Yes | QtWidgets.QMessageBox.No, QtWidgets.QMessageBox.No)
         if reply == QtWidgets.QMessageBox.Yes:
@@ -242,4 +209,5 @@ if __name__ == '__main__':
     app = QtWidgets.QApplication(sys.argv)
     mainWin = SagawaManagementSystem()
     mainWin.raise_()
+    preload_after_show("履行率処理")
     sys.exit(app.exec_())
@@ -0,0 +1,53 @@
+from PyQt5.QtCore import Qt, QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot
+from PyQt5.QtWidgets import QProgressDialog
+
+# 保存処理の結果を画面側へ通知するシグナル
+class SaveSignals(QObject):
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(object)
+
+# 保存処理をスレッドプールで実行（画面の操作はシグナルを受けた側で行う）
+class SaveWorker(QRunnable):
+    def __init__(self, function, *args):
+        super().__init__()
+        self.function = function
+        self.args = args
+        self.signals = SaveSignals()
+
+    @pyqtSlot()
+    def run(self):
+        try:
+            result = self.function(*self.args)
+        except Exception as e:
+            self.signals.failed.emit(e)
+        else:
+            self.signals.finished.emit(result)
+
+# 保存を開始し、終わるまで処理中の表示を出す
+# 完了時は on_finished(結果)、失敗時は on_failed(例外) が画面のスレッドで呼ばれる
+def start_save(parent, function, *args, on_finished, on_failed):
+    progress = QProgressDialog("保存しています...", None, 0, 0, parent)
+    progress.setWindowTitle("保存中")
+    progress.setWindowModality(Qt.WindowModal)
+    progress.setMinimumDuration(0)
+    progress.show()
+
+    worker = SaveWorker(function, *args)
+
+    def finish(callback, value):
+        progress.close()
+        parent.save_worker = None
+        callback(value)
+
+    worker.signals.finished.connect(lambda result: finish(on_finished, result))
+    worker.signals.failed.connect(lambda error: finish(on_failed, error))
+    # 完了するまでワーカーへの参照を保持
+    parent.save_worker = worker
+    QThreadPool.globalInstance().start(worker)
+    return worker
+
+# 保存エラーのメッセージ
+def save_error_message(error):
+    if isinstance(error, PermissionError):
+        return "ファイルにアクセスできません。Excelが開いていないことを確認してください。"
+    return f"保存中にエラーが発生しました: {str(error)}"
@@ -0,0 +1,168 @@
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer
+from PyQt5.QtGui import QIntValidator
+from PyQt5.QtWidgets import (QStyledItemDelegate, QComboBox, QLineEdit, QTableView, QHeaderView,
+                             QAbstractItemView)
+
+# 人数入力の反映を待つ時間（ミリ秒）、入力中は表を作り直さない
+ROW_COUNT_DEBOUNCE_MS = 300
+
+# 入力表のモデル（1行が社員1人分、1列目が社員名、残りが件数）
+class EntryTableModel(QAbstractTableModel):
+    def __init__(self, headers, parent=None):
+        super().__init__(parent)
+        self.headers = headers
+        self.rows = []
+        self.default_name = ""
+
+    def new_row(self):
+        return [self.default_name] + [0] * (len(self.headers) - 1)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        value = self.rows[index.row()][index.column()]
+        if role == Qt.DisplayRole:
+            return str(value)
+        if role == Qt.EditRole:
+            return value
+        if role == Qt.TextAlignmentRole and index.column() > 0:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.EditRole:
+            return False
+        self.rows[index.row()][index.column()] = value
+        self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.EditRole])
+        return True
+
+    def flags(self, index):
+        return super().flags(index) | Qt.ItemIsEditable
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.headers[section]
+        return f"社員 {section + 1}"
+
+    # 行数の変更（差分の行だけを追加・削除）
+    def set_row_count(self, count):
+        current = len(self.rows)
+        if count > current:
+            self.beginInsertRows(QModelIndex(), current, count - 1)
+            self.rows.extend(self.new_row() for _ in range(count - current))
+            self.endInsertRows()
+        elif count < current:
+            self.beginRemoveRows(QModelIndex(), count, current - 1)
+            del self.rows[count:]
+            self.endRemoveRows()
+
+    # 既存データの行を末尾に追加
+    def append_rows(self, rows):
+        rows = [list(row) for row in rows]
+        if not rows:
+            return
+        self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(rows) - 1)
+        self.rows.extend(rows)
+        self.endInsertRows()
+
+    # 指定した行を削除（後ろの行から順に削除）
+    def remove_rows(self, row_numbers):
+        for row in sorted(set(row_numbers), reverse=True):
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self.rows[row]
+            self.endRemoveRows()
+
+    def row_values(self):
+        return [list(row) for row in self.rows]
+
+# 社員名の入力（共有の名簿モデルを参照するコンボボックスで選択）
+class ComboBoxDelegate(QStyledItemDelegate):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.list_model = None
+
+    def createEditor(self, parent, option, index):
+        editor = QComboBox(parent)
+        if self.list_model is not None:
+            editor.setModel(self.list_model)
+        return editor
+
+    def setEditorData(self, editor, index):
+        editor.setCurrentText(index.data(Qt.EditRole))
+
+    def setModelData(self, editor, model, index):
+        model.setData(index, editor.currentText())
+
+# 件数の入力（0以上の整数のみ）
+class IntegerDelegate(QStyledItemDelegate):
+    def createEditor(self, parent, option, index):
+        editor = QLineEdit(parent)
+        editor.setValidator(QIntValidator(0, 99999, editor))
+        return editor
+
+    def setEditorData(self, editor, index):
+        editor.setText(str(index.data(Qt.EditRole)))
+
+    def setModelData(self, editor, model, index):
+        model.setData(index, int(editor.text() or 0))
+
+# 社員ごとの入力表（行数の変更は間引いてから差分だけ反映）
+class EntryGrid(QTableView):
+    def __init__(self, headers, parent=None):
+        super().__init__(parent)
+        self.entry_model = EntryTableModel(headers, self)
+        self.setModel(self.entry_model)
+
+        self.name_delegate = ComboBoxDelegate(self)
+        self.count_delegate = IntegerDelegate(self)
+        self.setItemDelegateForColumn(0, self.name_delegate)
+        for column in range(1, len(headers)):
+            self.setItemDelegateForColumn(column, self.count_delegate)
+
+        self.setEditTriggers(QAbstractItemView.AllEditTriggers)
+        self.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.setMinimumSize(len(headers) * 110, 300)
+
+        self.pending_row_count = None
+        self.row_count_timer = QTimer(self)
+        self.row_count_timer.setSingleShot(True)
+        self.row_count_timer.setInterval(ROW_COUNT_DEBOUNCE_MS)
+        self.row_count_timer.timeout.connect(self.apply_row_count)
+
+    # 社員名の選択肢（社員名簿の共有モデル、新しい行の初期値は先頭の社員）
+    def set_employee_model(self, list_model):
+        self.name_delegate.list_model = list_model
+        list_model.modelReset.connect(self.update_default_name)
+        self.update_default_name()
+
+    def update_default_name(self):
+        names = self.name_delegate.list_model.stringList()
+        self.entry_model.default_name = names[0] if names else ""
+
+    # 行数の変更を予約（連続した入力は最後の値だけを反映）
+    def request_row_count(self, count):
+        self.pending_row_count = count
+        self.row_count_timer.start()
+
+    # 予約された行数の変更を反映（保存前にも呼び出す）
+    def apply_row_count(self):
+        self.row_count_timer.stop()
+        if self.pending_row_count is not None:
+            self.entry_model.set_row_count(self.pending_row_count)
+            self.pending_row_count = None
+
+    def delete_selected_rows(self):
+        self.entry_model.remove_rows(index.row() for index in self.selectionModel().selectedRows())
+
+    def row_values(self):
+        self.apply_row_count()
+        return self.entry_model.row_values()
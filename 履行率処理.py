@@ -0,0 +1,53 @@
+import pandas as pd
+from 設定 import FULFILLMENT_BASE_DIRECTORY
+from データストア import save_day
+from スキーマ import FULFILLMENT_INPUT_COLUMNS
+
+# 入力項目（画面の並び順）
+INPUT_COLUMNS = FULFILLMENT_INPUT_COLUMNS
+COUNT_COLUMNS = INPUT_COLUMNS[1:]
+
+# 件数列を数値に変換（列ごとに一度だけ変換、空欄は0）
+def to_counts(df):
+    columns = [column for column in COUNT_COLUMNS if column in df.columns]
+    counts = df[columns].replace("", 0).fillna(0)
+    df[columns] = counts.apply(pd.to_numeric).astype("int64")
+    return df
+
+# 履行率を計算（小数点第2位まで、持ち出し総数が0の場合は0）
+def add_fulfillment_rate(df):
+    total = df['持ち出し総数']
+    rate = ((total - df['不履行数']) / total * 100).round(2)
+    df['履行率'] = rate.where(total > 0, 0.0)
+    return df
+
+# 入力値から数値型のDataFrameを作成
+def build_fulfillment_frame(data):
+    df = pd.DataFrame(data, columns=INPUT_COLUMNS)
+    return add_fulfillment_rate(to_counts(df))
+
+# 既存データへ社員名をキーに一括で反映（既存の社員は更新、新しい社員は入力順に末尾へ追加）
+def upsert_fulfillment(existing_df, df):
+    df = df.drop_duplicates('社員名', keep="last")
+    existing_df = to_counts(existing_df.copy())
+    merged = existing_df.assign(_既存順=range(len(existing_df))).merge(
+        df.assign(_追加順=range(len(df))), on='社員名', how="outer", suffixes=("_既存", ""), sort=False)
+
+    # 既存の行は元の位置、新しい行は末尾に並べる
+    merged = merged.sort_values(["_既存順", "_追加順"], na_position="last", ignore_index=True)
+
+    # 入力のある社員は入力値、ない社員は既存の値を使用
+    for column in df.columns.drop('社員名'):
+        if f"{column}_既存" in merged:
+            merged[column] = merged[column].combine_first(merged.pop(f"{column}_既存"))
+
+    columns = list(existing_df.columns) + [column for column in df.columns if column not in existing_df.columns]
+    return to_counts(merged[columns])
+
+# 日次ファイルのパス（ファイル名に年は含まれない）
+def fulfillment_file_path(month, day, base_directory=FULFILLMENT_BASE_DIRECTORY):
+    return f"{base_directory}/履行率管理_{month}_{day}.xlsx"
+
+# 1日分の保存（既存データには社員名をキーに反映）
+def save_fulfillment_day(file_path, date, df):
+    return save_day("履行率管理", "反映", file_path, date, df)
@@ -1,125 +1,224 @@
 import sys
-import os
-import pandas as pd
-from PyQt5.QtWidgets import QApplication, QWidget, QPushButton, QVBoxLayout, QLabel, QComboBox, QMessageBox
-
-# 誤配率の計算関数
-def calculate_misdelivery_rate(total_deliveries, total_misdeliveries):
-    if total_deliveries == 0:
-        return 0
-    return (total_misdeliveries / total_deliveries) * 100
-
-# 月次集計機能（社員ごとの総持ち出し総数と総誤配数、全体の総誤配率の計算）
-def monthly_aggregation(base_directory, year, month):
+import threading
+import time
+from 設定 import MISDELIVERY_BASE_DIRECTORY
+from 計測 import span
+from 遅延読込 import PRELOAD_DELAY_MS, lazy_module, preload_after_show
+from データモデル import DataFrameTableModel
+from PyQt5.QtCore import QDate, QObject, QTimer, pyqtSignal
+from PyQt5.QtWidgets import (QApplication, QWidget, QPushButton, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QMessageBox,
+                             QDateEdit, QTableView, QAbstractItemView)
+
+# 集計処理は pandas を含むため、最初に使う時か画面の表示後に読み込む
+集計処理 = lazy_module("集計処理")
+社員履歴 = lazy_module("社員履歴")
+集計キャッシュ = lazy_module("集計キャッシュ")
+月次監視 = lazy_module("月次監視")
+
+# 誤配率の計算関数（集計処理.py へ移動、以前の import 先からも参照できるようにする）
+def __getattr__(name):
+    if name == "calculate_misdelivery_rate":
+        return 集計処理.calculate_misdelivery_rate
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# 月次集計機能（集計処理は 集計処理.py、エラーはダイアログで表示）
+def monthly_aggregation(base_directory, year, month, jobs=None, executor="thread"):
     try:
-        month_folder = os.path.join(base_directory, year, month)
-        monthly_summary = pd.DataFrame()
-
-        # 月フォルダ内の全Excelファイルを結合、既存の月次集計ファイルは除外
-        for filename in os.listdir(month_folder):
-            if filename.endswith(".xlsx") and not filename.startswith(f"{year}_{month}_月次集計"):
-                file_path = os.path.join(month_folder, filename)
-                df = pd.read_excel(file_path)
-                monthly_summary = pd.concat([monthly_summary, df])
-
-        # 社員ごとの総持ち出し総数と総誤配数の集計
-        monthly_total = monthly_summary.groupby("社員").agg({
-            '持ち出し総数': 'sum',
-            '誤配数': 'sum'
-        }).reset_index()
-
-        # 全体の持ち出し総数と誤配数の計算
-        total_deliveries = monthly_total['持ち出し総数'].sum()
-        total_misdeliveries = monthly_total['誤配数'].sum()
-        overall_misdelivery_rate = calculate_misdelivery_rate(total_deliveries, total_misdeliveries)
-
-        # 社員ごとの誤配率の計算
-        monthly_total['誤配率'] = monthly_total.apply(
-            lambda x: calculate_misdelivery_rate(x['持ち出し総数'], x['誤配数']), axis=1
-        )
-        monthly_total['誤配率'] = monthly_total['誤配率'].apply(lambda x: f"{x:.2f}%")
-
-        # 全体の誤配率の行を追加
-        overall_row = pd.DataFrame({
-            '社員': ['全体'],
-            '持ち出し総数': [total_deliveries],
-            '誤配数': [total_misdeliveries],
-            '誤配率': [f"{overall_misdelivery_rate:.2f}%"]
-        })
-        monthly_total = pd.concat([monthly_total, overall_row], ignore_index=True)
-
-        # 保存
-        output_path = os.path.join(month_folder, f"{year}_{month}_月次集計.xlsx")
-        with pd.ExcelWriter(output_path, engine='xlsxwriter') as writer:
-            monthly_total.to_excel(writer, index=False)
-            worksheet = writer.sheets['Sheet1']
-            for idx, col in enumerate(monthly_total.columns):
-                worksheet.set_column(idx, idx, 20)  # 列幅を20に固定
-
-        return output_path
-
+        with span("gui:monthly_aggregation", year=year, month=month):
+            return 集計処理.monthly_aggregation(base_directory, year, month, jobs, executor)
     except PermissionError:
         QMessageBox.critical(None, "アクセスエラー", f"ファイルにアクセスできません。Excelが開いていないことを確認してください。")
     except Exception as e:
         QMessageBox.critical(None, "エラー", f"月次集計中にエラーが発生しました: {str(e)}")
 
-# 年次集計機能（社員ごとの総持ち出し総数と総誤配数、全体の総誤配率の計算）
-def yearly_aggregation(base_directory, year):
+# 年次集計機能（集計処理は 集計処理.py、エラーはダイアログで表示）
+def yearly_aggregation(base_directory, year, jobs=None, executor="thread"):
     try:
-        year_folder = os.path.join(base_directory, year)
-        yearly_summary = pd.DataFrame()
-
-        # 年フォルダ内の月フォルダから全Excelファイルを読み込み、既存の集計ファイルは除外
-        for month in os.listdir(year_folder):
-            month_folder = os.path.join(year_folder, month)
-            if os.path.isdir(month_folder):
-                for filename in os.listdir(month_folder):
-                    if filename.endswith(".xlsx") and not filename.startswith(f"{year}_") and not filename.endswith("月次集計.xlsx"):
-                        file_path = os.path.join(month_folder, filename)
-                        df = pd.read_excel(file_path)
-                        yearly_summary = pd.concat([yearly_summary, df])
-
-        # 社員ごとの総持ち出し総数と総誤配数の集計
-        yearly_total = yearly_summary.groupby("社員").agg({
-            '持ち出し総数': 'sum',
-            '誤配数': 'sum'
-        }).reset_index()
-
-        # 全体の持ち出し総数と誤配数の計算
-        total_deliveries = yearly_total['持ち出し総数'].sum()
-        total_misdeliveries = yearly_total['誤配数'].sum()
-        overall_misdelivery_rate = calculate_misdelivery_rate(total_deliveries, total_misdeliveries)
-
-        # 社員ごとの誤配率の計算
-        yearly_total['誤配率'] = yearly_total.apply(
-            lambda x: calculate_misdelivery_rate(x['持ち出し総数'], x['誤配数']), axis=1
-        )
-        yearly_total['誤配率'] = yearly_total['誤配率'].apply(lambda x: f"{x:.2f}%")
-
-        # 全体の誤配率の行を追加
-        overall_row = pd.DataFrame({
-            '社員': ['全体'],
-            '持ち出し総数': [total_deliveries],
-            '誤配数': [total_misdeliveries],
-            '誤配率': [f"{overall_misdelivery_rate:.2f}%"]
-        })
-        yearly_total = pd.concat([yearly_total, overall_row], ignore_index=True)
-
-        # 保存
-        output_path = os.path.join(year_folder, f"{year}_年次集計.xlsx")
-        with pd.ExcelWriter(output_path, engine='xlsxwriter') as writer:
-            yearly_total.to_excel(writer, index=False)
-            worksheet = writer.sheets['Sheet1']
-            for idx, col in enumerate(yearly_total.columns):
-                worksheet.set_column(idx, idx, 20)  # 列幅を20に固定
-
-        return output_path
-
+        with span("gui:yearly_aggregation", year=year):
+            return 集計処理.yearly_aggregation(base_directory, year, jobs, executor)
     except PermissionError:
         QMessageBox.critical(None, "アクセスエラー", f"ファイルにアクセスできません。Excelが開いていないことを確認してください。")
     except Exception as e:
         QMessageBox.critical(None, "エラー", f"年次集計中にエラーが発生しました: {str(e)}")
 
+# 年間パック（年次・月別・社員別のシートを1つのファイルに出力、エラーはダイアログで表示）
+def annual_pack(base_directory, year, jobs=None, executor="thread"):
+    try:
+        with span("gui:annual_pack", year=year):
+            return 集計処理.annual_pack(base_directory, year, jobs, executor)
+    except PermissionError:
+        QMessageBox.critical(None, "アクセスエラー", f"ファイルにアクセスできません。Excelが開いていないことを確認してください。")
+    except Exception as e:
+        QMessageBox.critical(None, "エラー", f"年間パックの作成中にエラーが発生しました: {str(e)}")
+
+# 社員別の日別履歴ウィンドウ（ストアに記録されたデータから1人分だけを表示）
+class HistoryWindow(QWidget):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.init_ui()
+
+    def init_ui(self):
+        layout = QVBoxLayout()
+
+        condition_layout = QHBoxLayout()
+        self.employee_combobox = QComboBox()
+        self.employee_combobox.setEditable(True)
+        condition_layout.addWidget(QLabel("社員"))
+        condition_layout.addWidget(self.employee_combobox, 1)
+
+        today = QDate.currentDate()
+        self.start_date = QDateEdit(QDate(today.year(), 1, 1))
+        self.start_date.setCalendarPopup(True)
+        self.start_date.setDisplayFormat("yyyy-MM-dd")
+        self.end_date = QDateEdit(today)
+        self.end_date.setCalendarPopup(True)
+        self.end_date.setDisplayFormat("yyyy-MM-dd")
+        condition_layout.addWidget(self.start_date)
+        condition_layout.addWidget(QLabel("～"))
+        condition_layout.addWidget(self.end_date)
+
+        self.search_button = QPushButton('表示')
+        self.search_button.clicked.connect(self.show_history)
+        condition_layout.addWidget(self.search_button)
+        layout.addLayout(condition_layout)
+
+        self.table_view = QTableView()
+        self.table_view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        layout.addWidget(self.table_view)
+
+        self.summary_label = QLabel("")
+        layout.addWidget(self.summary_label)
+
+        self.setLayout(layout)
+        self.setWindowTitle('社員別履歴')
+        self.resize(760, 480)
+        self.load_employees()
+
+    def load_employees(self):
+        try:
+            self.employee_combobox.addItems(社員履歴.list_employees())
+        except Exception as e:
+            QMessageBox.warning(self, "エラー", f"社員の一覧を取得できませんでした: {str(e)}")
+
+    def show_history(self):
+        employee = self.employee_combobox.currentText().strip()
+        if not employee:
+            QMessageBox.warning(self, "入力エラー", "社員を選択してください。")
+            return
+        start = self.start_date.date().toString("yyyy-MM-dd")
+        end = self.end_date.date().toString("yyyy-MM-dd")
+        try:
+            history = 社員履歴.driver_history(employee, start, end)
+        except Exception as e:
+            QMessageBox.critical(self, "エラー", f"履歴の取得中にエラーが発生しました: {str(e)}")
+            return
+
+        self.table_view.setModel(DataFrameTableModel(history.astype(object).where(history.notna(), ""), self.table_view))
+        self.table_view.resizeColumnsToContents()
+        self.summary_label.setText(f"{employee}: {len(history)}日分")
+
+# 集計パネルへの更新の通知（確認用のスレッドから画面のスレッドへ）
+class LiveSignals(QObject):
+    updated = pyqtSignal()
+
+# 選択中の年月の社員ごとの誤配率と全体の誤配率を表示するパネル
+# 社員ごとの合計はバックグラウンドのスレッドで月フォルダを確認して差分だけを反映し、メモリに保持する
+# 年月の切り替えや保存の反映では保持している合計から表を作るため、日次ファイルや月次集計ファイルは読み直さない
+# 月次集計ファイルは書き込まない（月次集計ボタンまたは集計コマンドの watch で作成）
+class LiveSummaryPanel(QWidget):
+    def __init__(self, base_directory=MISDELIVERY_BASE_DIRECTORY, parent=None):
+        super().__init__(parent)
+        self.base_directory = base_directory
+        self.year = None
+        self.month = None
+        self.watcher = None
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.wake_event = threading.Event()
+        self.signals = LiveSignals()
+        self.signals.updated.connect(self.render)
+        self.init_ui()
+
+    def init_ui(self):
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self.overall_label = QLabel("誤配率を読み込んでいます...")
+        layout.addWidget(self.overall_label)
+
+        self.table_view = QTableView()
+        self.table_view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table_view.setMinimumHeight(240)
+        self.model = None
+        layout.addWidget(self.table_view)
+
+        self.setLayout(layout)
+
+    # 表示する年月の変更（保持している合計から表示し直し、その年を読み込んでいなければ確認を急ぐ）
+    def set_period(self, year, month):
+        self.year, self.month = year, month
+        if self.watcher is not None:
+            self.watcher.watch_year(year)
+            self.wake_event.set()
+        self.render()
+
+    # 確認用のスレッドの開始（pandas を含むため画面の表示後に開始し、確認用のスレッドで読み込む）
+    def start(self):
+        self.stop_event.clear()
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.thread = threading.Thread(target=self.run, name="誤配率の集計", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.wake_event.set()
+
+    def run(self):
+        if self.watcher is None:
+            # 集計キャッシュは読み込んだ時点の複製を使う（保存はしない）
+            self.watcher = 月次監視.MonthlyWatcher(self.base_directory, years=[self.year] if self.year else None,
+                                                cache=集計キャッシュ.load_cache())
+        loaded_years = None
+        while not self.stop_event.is_set():
+            # 反映したファイルがあるか、新しい年を読み込んだ場合に表示し直す
+            years = self.watcher.watched_years()
+            try:
+                applied = self.watcher.poll()
+            except OSError:
+                # フォルダにアクセスできない場合は次の確認で再度試す
+                applied = 0
+            if applied or years != loaded_years:
+                self.signals.updated.emit()
+                loaded_years = years
+            self.wake_event.wait(月次監視.POLL_INTERVAL)
+            self.wake_event.clear()
+
+    # 選択中の年月の表を作り直す
+    def render(self):
+        totals = self.watcher.month_totals(self.year, self.month) if self.watcher is not None else None
+        if totals is None:
+            self.overall_label.setText("誤配率を読み込んでいます...")
+            return
+        if not totals:
+            self.overall_label.setText(f"{self.year}年{self.month}月のデータはありません。")
+            if self.model is not None:
+                self.model.set_dataframe(self.model.df.iloc[0:0])
+            return
+
+        with span("gui:live_summary", year=self.year, month=self.month, employees=len(totals)):
+            summary = 集計処理.build_summary(集計キャッシュ.merge_partials([totals]))
+            overall = summary.iloc[-1]
+            self.overall_label.setText(
+                f"{self.year}年{self.month}月 全体の誤配率: {overall['誤配率']:.2f}%"
+                f"（持ち出し総数 {overall['持ち出し総数']} / 誤配数 {overall['誤配数']}、{time.strftime('%H:%M:%S')} 更新）")
+            if self.model is None:
+                self.model = DataFrameTableModel(summary, self.table_view)
+                self.table_view.setModel(self.model)
+            else:
+                self.model.set_dataframe(summary)
+            self.table_view.resizeColumnsToContents()
+
 # メインウィンドウの実装
 class MainWindow(QWidget):
     def __init__(self):
@@ -150,17 +249,33 @@ class MainWindow(QWidget):
         self.yearly_button.clicked.connect(self.yearly_aggregation)
         layout.addWidget(self.yearly_button)
 
+        self.pack_button = QPushButton('年間パック')
+        self.pack_button.clicked.connect(self.annual_pack)
+        layout.addWidget(self.pack_button)
+
+        self.history_button = QPushButton('社員別履歴')
+        self.history_button.clicked.connect(self.show_history_window)
+        layout.addWidget(self.history_button)
+        self.history_window = None
+
         self.exit_button = QPushButton('終了')
         self.exit_button.clicked.connect(self.close_application)
         layout.addWidget(self.exit_button)
 
+        # 選択中の年月の誤配率（年月を切り替えると表示し直す）
+        self.live_panel = LiveSummaryPanel(MISDELIVERY_BASE_DIRECTORY)
+        self.year_combobox.currentTextChanged.connect(self.update_live_panel)
+        self.month_combobox.currentTextChanged.connect(self.update_live_panel)
+        self.update_live_panel()
+        layout.addWidget(self.live_panel)
+
         self.setLayout(layout)
         self.setWindowTitle('誤配管理集計')
         self.adjustSize()  # ウィンドウサイズを自動調整
 
     def monthly_aggregation(self):
         try:
-            base_directory = 'C:\\Users\\Owner\\OneDrive\\デスクトップ\\誤配管理'
+            base_directory = MISDELIVERY_BASE_DIRECTORY
             year = self.year_combobox.currentText()
             month = self.month_combobox.currentText()
             output_path = monthly_aggregation(base_directory, year, month)
@@ -170,13 +285,40 @@ class MainWindow(QWidget):
 
     def yearly_aggregation(self):
         try:
-            base_directory = 'C:\\Users\\Owner\\OneDrive\\デスクトップ\\誤配管理'
+            base_directory = MISDELIVERY_BASE_DIRECTORY
             year = self.year_combobox.currentText()
             output_path = yearly_aggregation(base_directory, year)
             self.label.setText(f"年次集計完了: {output_path}")
         except Exception as e:
             QMessageBox.critical(self, "エラー", f"年次集計中にエラーが発生しました: {str(e)}")
 
+    def annual_pack(self):
+        try:
+            base_directory = MISDELIVERY_BASE_DIRECTORY
+            year = self.year_combobox.currentText()
+            output_path = annual_pack(base_directory, year)
+            self.label.setText(f"年間パック作成完了: {output_path}")
+        except Exception as e:
+            QMessageBox.critical(self, "エラー", f"年間パックの作成中にエラーが発生しました: {str(e)}")
+
+    def show_history_window(self):
+        if self.history_window is None:
+            self.history_window = HistoryWindow()
+        self.history_window.show()
+        self.history_window.raise_()
+
+    def update_live_panel(self):
+        self.live_panel.set_period(self.year_combobox.currentText(), self.month_combobox.currentText())
+
+    # 誤配率の集計は最初の描画の後に開始し、閉じる時に止める
+    def showEvent(self, event):
+        super().showEvent(event)
+        QTimer.singleShot(PRELOAD_DELAY_MS, self.live_panel.start)
+
+    def closeEvent(self, event):
+        self.live_panel.stop()
+        super().closeEvent(event)
+
     def close_application(self):
         self.close()
 
@@ -185,4 +327,5 @@ if __name__ == '__main__':
     app = QApplication(sys.argv)
     main_window = MainWindow()
     main_window.show()
+    preload_after_show("集計処理", "社員履歴")
     sys.exit(app.exec_())
@@ -0,0 +1,203 @@
+import os
+import time
+import threading
+from datetime import datetime
+from 設定 import MISDELIVERY_BASE_DIRECTORY
+from データストア import cache_key, file_signature
+from 集計キャッシュ import SUM_COLUMNS, load_cache, save_cache, summarize_daily_file, merge_partials, record_summary
+from 集計処理 import build_summary, is_summary_fresh, list_month_files, list_month_folders, monthly_summary_path, write_summary
+from 計測 import span
+
+# 月次集計ファイルの自動更新
+# 年/月フォルダを一定間隔で確認し、追加・変更・削除された日次ファイルの分だけ社員ごとの合計を加減する
+# 保存が続いている間は書き込まず、最後の変更から DEBOUNCE_SECONDS 秒後にまとめて月次集計ファイルを作り直す
+
+# フォルダを確認する間隔（秒）
+POLL_INTERVAL = 2.0
+
+# 最後の変更から月次集計ファイルを作り直すまでの時間と、保存が続く場合でも作り直すまでの最大の時間（秒）
+DEBOUNCE_SECONDS = 5.0
+MAX_DELAY_SECONDS = 60.0
+
+class MonthlyWatcher:
+    def __init__(self, base_directory=MISDELIVERY_BASE_DIRECTORY, years=None, debounce=DEBOUNCE_SECONDS,
+                 max_delay=MAX_DELAY_SECONDS, on_rewrite=None, on_error=None, cache=None):
+        self.base_directory = base_directory
+        self.years = list(years or [])
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.on_rewrite = on_rewrite
+        self.on_error = on_error
+        # 月ごとの状態（(年, 月) → 日次ファイルの識別情報と部分集計、社員ごとの合計、未反映の変更の時刻）
+        self.months = {}
+        self.cache = load_cache() if cache is None else cache
+        self.cache_changed = False
+        # 画面など別のスレッドから合計を参照する場合の排他（確認中のファイルの読み込み中は保持しない）
+        self.lock = threading.Lock()
+        self.loaded_years = set()
+
+    # 対象の年（指定がなければ今年）
+    def watched_years(self):
+        with self.lock:
+            return list(self.years) or [str(datetime.now().year)]
+
+    # 対象の年を追加（次の確認から読み込む）
+    def watch_year(self, year):
+        with self.lock:
+            if year not in self.years:
+                self.years.append(year)
+
+    # 月の社員ごとの合計の複製（社員 → [持ち出し総数, 誤配数]）、その年をまだ確認していない場合は None
+    def month_totals(self, year, month):
+        with self.lock:
+            if year not in self.loaded_years:
+                return None
+            state = self.months.get((year, month))
+            return {name: values[:-1] for name, values in state["totals"].items()} if state else {}
+
+    # 日次ファイルの部分集計（変更のないファイルは集計キャッシュを使用）
+    def read_partial(self, file_path, signature):
+        key = cache_key(file_path)
+        entry = self.cache.get(key)
+        if entry is not None and entry["signature"] == signature:
+            return entry["partial"]
+        partial = summarize_daily_file(file_path)
+        self.cache[key] = {"signature": signature, "partial": partial}
+        self.cache_changed = True
+        return partial
+
+    # 1ファイル分の差分を合計に反映（partial が None の場合は削除）
+    def apply(self, state, file_path, partial):
+        totals = state["totals"]
+        old = state["partials"].pop(file_path, None)
+        for name, values in (old or {}).items():
+            total = totals[name]
+            for i, value in enumerate(values):
+                total[i] -= value
+            total[-1] -= 1
+            if total[-1] == 0:
+                del totals[name]
+        for name, values in (partial or {}).items():
+            total = totals.setdefault(name, [0] * len(SUM_COLUMNS) + [0])
+            for i, value in enumerate(values):
+                total[i] += value
+            total[-1] += 1
+        if partial is not None:
+            state["partials"][file_path] = partial
+
+    # 全ての対象の月フォルダを確認し、変更されたファイルの差分を反映（反映したファイル数を返す）
+    # 共有フォルダに接続できない場合などフォルダを確認できない年・月は on_error で通知し、次の確認で再度確認する
+    def poll(self, now=None):
+        now = time.monotonic() if now is None else now
+        applied = 0
+        for year in self.watched_years():
+            year_folder = os.path.join(self.base_directory, year)
+            try:
+                months = sorted(list_month_folders(self.base_directory, year)) if os.path.isdir(year_folder) else []
+            except OSError as e:
+                if self.on_error:
+                    self.on_error(year, None, year_folder, e)
+                continue
+            failed = False
+            for month in months:
+                try:
+                    applied += self.poll_month(year, month, now)
+                except OSError as e:
+                    failed = True
+                    if self.on_error:
+                        self.on_error(year, month, os.path.join(year_folder, month), e)
+            # 全ての月を確認できた年だけを読み込み済みとする
+            if not failed:
+                with self.lock:
+                    self.loaded_years.add(year)
+        return applied
+
+    def poll_month(self, year, month, now):
+        key = (year, month)
+        initial = key not in self.months
+        with self.lock:
+            state = self.months.setdefault(key, {"files": {}, "partials": {}, "totals": {}, "changed": None, "first_change": None})
+        file_paths = list_month_files(self.base_directory, year, month)
+
+        signatures = {}
+        for file_path in file_paths:
+            try:
+                signatures[file_path] = file_signature(file_path)
+            except FileNotFoundError:
+                continue
+        changed = [file_path for file_path, signature in signatures.items() if state["files"].get(file_path) != signature]
+        removed = [file_path for file_path in state["files"] if file_path not in signatures]
+        if not changed and not removed:
+            return 0
+
+        with span("watch:apply", year=year, month=month, changed=len(changed), removed=len(removed)):
+            partials = {}
+            for file_path in changed:
+                try:
+                    partials[file_path] = self.read_partial(file_path, signatures[file_path])
+                except Exception as e:
+                    # 書き込み途中などで読めないファイルは、次の確認で読み直す
+                    if self.on_error:
+                        self.on_error(year, month, file_path, e)
+            with self.lock:
+                for file_path in removed:
+                    self.apply(state, file_path, None)
+                    del state["files"][file_path]
+                for file_path, partial in partials.items():
+                    self.apply(state, file_path, partial)
+                    state["files"][file_path] = signatures[file_path]
+
+        # 読めなかったファイルしかない場合は合計が変わっていないため、作り直しの対象にしない
+        applied = len(partials) + len(removed)
+        if not applied:
+            return 0
+        # 開始時は、月次集計ファイルが既に最新の月は作り直さない
+        if initial and is_summary_fresh(self.cache, monthly_summary_path(self.base_directory, year, month), file_paths):
+            return applied
+        state["changed"] = now
+        state["first_change"] = state["first_change"] or now
+        return applied
+
+    # 変更が落ち着いた月の月次集計ファイルを作り直す（作り直したファイルのパスを返す）
+    def flush(self, now=None, force=False):
+        now = time.monotonic() if now is None else now
+        written = []
+        for (year, month), state in sorted(self.months.items()):
+            if state["changed"] is None:
+                continue
+            settled = now - state["changed"] >= self.debounce or now - state["first_change"] >= self.max_delay
+            if not (force or settled):
+                continue
+            output_path = monthly_summary_path(self.base_directory, year, month)
+            with self.lock:
+                totals = {name: values[:-1] for name, values in state["totals"].items()}
+                sources = {cache_key(file_path): signature for file_path, signature in state["files"].items()}
+            try:
+                with span("watch:rewrite", year=year, month=month, employees=len(totals)):
+                    write_summary(build_summary(merge_partials([totals])), output_path)
+                    record_summary(self.cache, output_path, sources, totals)
+                    self.cache_changed = True
+            except OSError as e:
+                # Excelで開かれている場合などは、次の確認で再度作り直す
+                if self.on_error:
+                    self.on_error(year, month, output_path, e)
+                continue
+            state["changed"] = state["first_change"] = None
+            written.append(output_path)
+            if self.on_rewrite:
+                self.on_rewrite(year, month, output_path, len(state["files"]))
+        if self.cache_changed:
+            save_cache(self.cache)
+            self.cache_changed = False
+        return written
+
+    # stop が設定されるまで確認と作り直しを繰り返す（終了時は未反映の変更も書き込む）
+    def run(self, interval=POLL_INTERVAL, stop=None):
+        stop = stop or threading.Event()
+        try:
+            while not stop.is_set():
+                self.poll()
+                self.flush()
+                stop.wait(interval)
+        finally:
+            self.flush(force=True)
@@ -0,0 +1,111 @@
+from datetime import datetime
+from contextlib import closing
+import pandas as pd
+from 設定 import DATA_STORE_PATH
+from データストア import LAYOUTS, column_names, connect, file_signature, insert_day, quote
+from 一括取込 import load_daily_file
+from 集計処理 import build_summary
+from 履行率処理 import COUNT_COLUMNS, add_fulfillment_rate
+from 計測 import span
+from ジャーナル import day_exists
+from Excel出力 import EXCEL_MAX_ROWS, StreamingWorkbook
+
+# 任意の期間（週・四半期・経路変更以降など）の集計
+# ストアの (日付, 社員) インデックスから該当する行だけを集計し、フォルダの一覧取得やExcelの読み込みは行わない
+# ストアへの登録は各アプリの保存時と 集計コマンド import で行われる
+
+# 日付の正規化（YYYY-MM-DD 以外は ValueError）
+def normalize_date(text):
+    return datetime.strptime(text, "%Y-%m-%d").strftime("%Y-%m-%d")
+
+# 期間内のファイルの変更を反映（登録済みのファイルだけを確認し、変更・削除されたものを更新）
+def refresh_range(conn, kind, start, end):
+    stats = {"checked": 0, "updated": 0, "removed": 0}
+    sources = conn.execute("SELECT パス, 日付, 更新時刻, サイズ FROM ソースファイル WHERE 種別 = ? AND 日付 BETWEEN ? AND ?",
+                           (kind, start, end)).fetchall()
+    for path, date, mtime, size in sources:
+        stats["checked"] += 1
+        if not day_exists(path):
+            conn.execute(f"DELETE FROM {quote(kind)} WHERE 日付 = ?", (date,))
+            conn.execute("DELETE FROM ソースファイル WHERE パス = ?", (path,))
+            stats["removed"] += 1
+            continue
+        signature = file_signature(path)
+        if signature == [mtime, size]:
+            continue
+        df, error = load_daily_file((kind, path))
+        if error:
+            # 読み込めなくなったファイルの行は集計に含めない
+            conn.execute(f"DELETE FROM {quote(kind)} WHERE 日付 = ?", (date,))
+            conn.execute("DELETE FROM ソースファイル WHERE パス = ?", (path,))
+            conn.execute("INSERT OR REPLACE INTO 取込エラー VALUES (?, ?, ?, ?)", (path, *signature, error))
+            stats["removed"] += 1
+        else:
+            insert_day(conn, kind, date, df, path, signature)
+            stats["updated"] += 1
+    conn.commit()
+    return stats
+
+# 期間内の社員ごとの合計（employees を指定した場合はその社員のみ）
+def sum_range(kind, start, end, columns, employees=None, refresh=True, store_path=DATA_STORE_PATH):
+    start, end = normalize_date(start), normalize_date(end)
+    employee = LAYOUTS[kind]["employee_column"]
+    sums = ", ".join(f"SUM({quote(column)}) AS {quote(column)}" for column in columns)
+    query = (f"SELECT {quote(employee)}, {sums}, COUNT(DISTINCT 日付) AS 日数 FROM {quote(kind)} "
+             f"WHERE 日付 BETWEEN ? AND ?")
+    params = [start, end]
+    if employees:
+        query += f" AND {quote(employee)} IN ({', '.join('?' for _ in employees)})"
+        params += list(employees)
+    query += f" GROUP BY {quote(employee)} ORDER BY {quote(employee)}"
+
+    with span("range:sum", kind=kind, start=start, end=end) as fields, closing(connect(store_path)) as conn:
+        if refresh:
+            fields.update(refresh_range(conn, kind, start, end))
+        df = pd.read_sql_query(query, conn, params=params)
+        fields["rows"] = len(df)
+    df[columns] = df[columns].fillna(0).astype("int64")
+    return df
+
+# 期間の誤配集計（月次・年次集計と同じ列構成で、最後に全体の行）
+def misdelivery_range(start, end, employees=None, refresh=True, store_path=DATA_STORE_PATH):
+    total = sum_range("誤配管理", start, end, ['持ち出し総数', '誤配数'], employees, refresh, store_path)
+    return build_summary(total.drop(columns='日数'))
+
+# 期間の履行率集計（件数の合計から履行率を計算し、出勤日数を付加）
+def fulfillment_range(start, end, employees=None, refresh=True, store_path=DATA_STORE_PATH):
+    total = sum_range("履行率管理", start, end, COUNT_COLUMNS, employees, refresh, store_path)
+    return add_fulfillment_rate(total)
+
+# 期間内の明細（日付順の全ての行）をExcelへ出力
+# ストアから1行ずつ読みながら書き込むため、複数年分でも使用メモリは一定（1シートの行数を超えた分は次のシートへ）
+def export_range(kind, start, end, output_path, employees=None, refresh=True, store_path=DATA_STORE_PATH):
+    start, end = normalize_date(start), normalize_date(end)
+    names = column_names(kind)
+    employee = LAYOUTS[kind]["employee_column"]
+    query = f"SELECT 日付, {', '.join(map(quote, names))} FROM {quote(kind)} WHERE 日付 BETWEEN ? AND ?"
+    params = [start, end]
+    if employees:
+        query += f" AND {quote(employee)} IN ({', '.join('?' for _ in employees)})"
+        params += list(employees)
+    query += " ORDER BY 日付, 行番号"
+
+    count = 0
+    with closing(connect(store_path)) as conn, span("range:export", kind=kind, start=start, end=end, path=output_path) as fields:
+        if refresh:
+            refresh_range(conn, kind, start, end)
+        with StreamingWorkbook(output_path) as workbook:
+            sheet = workbook.add_sheet(["日付", *names], kind)
+            for values in conn.execute(query, params):
+                if sheet.row >= EXCEL_MAX_ROWS:
+                    sheet = workbook.add_sheet(["日付", *names], f"{kind}_{len(workbook.sheets) + 1}")
+                sheet.write_row(values)
+                count += 1
+        fields["rows"] = count
+    return count
+
+# 期間集計の種類
+RANGE_AGGREGATIONS = {
+    "誤配管理": misdelivery_range,
+    "履行率管理": fulfillment_range,
+}
@@ -0,0 +1,38 @@
+import os
+
+# 社員名簿（社員名.txt）
+# ファイルごとに1つだけ作成し、更新日時かサイズが変わった時だけ読み直す
+class EmployeeRoster:
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.signature = None
+        self.names = []
+        self.model = None
+
+    # 社員名の一覧（ファイルがない場合は FileNotFoundError）
+    def get_names(self):
+        stat = os.stat(self.file_path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature != self.signature:
+            with open(self.file_path, "r", encoding="utf-8") as file:
+                self.names = [name for name in (line.strip() for line in file) if name]
+            self.signature = signature
+            if self.model is not None:
+                self.model.setStringList(self.names)
+        return self.names
+
+    # 全てのコンボボックスで共有するモデル（名簿が読み直されると全てのコンボボックスに反映）
+    def list_model(self):
+        if self.model is None:
+            from PyQt5.QtCore import QStringListModel
+            self.model = QStringListModel(self.names)
+        return self.model
+
+_rosters = {}
+
+# パスごとに共有される社員名簿
+def get_roster(file_path):
+    key = os.path.normcase(os.path.abspath(file_path))
+    if key not in _rosters:
+        _rosters[key] = EmployeeRoster(file_path)
+    return _rosters[key]
@@ -0,0 +1,27 @@
+from contextlib import closing
+from 設定 import DATA_STORE_PATH
+from データストア import LAYOUTS, connect, quote
+from 統合集計 import combined_kpis
+from 計測 import span
+
+# 社員ごとの日別の履歴
+# 統合表を1人分に絞って取得するため、ストアの (社員, 日付) インデックスで1人分の行だけを読む
+
+# 履歴の列（統合表から日付と件数・率の列を選択）
+HISTORY_COLUMNS = ["日付", "持ち出し総数", "誤配数", "誤配率", "履行率管理の持ち出し総数", "不履行数", "履行率"]
+
+# 社員の日別の持ち出し総数・誤配数・不履行数と各率（どちらかのデータがある日のみ、日付順）
+def driver_history(employee, start, end, refresh=False, store_path=DATA_STORE_PATH):
+    with span("history:driver", employee=employee, start=start, end=end) as fields:
+        history = combined_kpis(start, end, [employee], refresh=refresh, store_path=store_path)
+        fields["rows"] = len(history)
+    return history[HISTORY_COLUMNS].reset_index(drop=True)
+
+# ストアに記録されている社員の一覧（誤配管理と履行率管理の両方）
+def list_employees(store_path=DATA_STORE_PATH):
+    with closing(connect(store_path)) as conn:
+        names = set()
+        for kind, layout in LAYOUTS.items():
+            employee = quote(layout["employee_column"])
+            names.update(name for (name,) in conn.execute(f"SELECT DISTINCT {employee} FROM {quote(kind)} WHERE {employee} IS NOT NULL"))
+    return sorted(names)
@@ -0,0 +1,173 @@
+from contextlib import closing
+import numpy as np
+import pandas as pd
+from 設定 import DATA_STORE_PATH
+from データストア import LAYOUTS, connect, quote
+from 期間集計 import normalize_date, refresh_range
+from スキーマ import RATE_FORMAT
+from Excel出力 import StreamingWorkbook
+from 計測 import span
+
+# 社員ごとの移動集計（直近7・30・90日の誤配率と履行率を、期間内の全ての日について）
+# 日別の件数を (日, 社員, 件数の種類) の配列に並べ、累積和の差で全ての日の期間合計を一度に求める
+# RollingKPI を保持し続ける呼び出し側は、保存された日を update_day で反映すれば、その日を含む期間の合計だけを差し替えられる
+# 現在は保存処理から update_day は呼ばれず、集計コマンド kpi は実行のたびにストアから load で作り直す
+
+# 集計する日数
+WINDOWS = (7, 30, 90)
+
+# 集計する件数（種別, 列）、率は 誤配数 / 持ち出し総数 と (持ち出し総数 - 不履行数) / 持ち出し総数
+METRICS = [
+    ("誤配管理", "持ち出し総数"),
+    ("誤配管理", "誤配数"),
+    ("履行率管理", "持ち出し総数"),
+    ("履行率管理", "不履行数"),
+]
+
+# 営業所全体の行の社員名
+TOTAL_NAME = "全体"
+
+# 種別の件数の列と、METRICS での位置
+def metric_columns(kind):
+    return [column for metric_kind, column in METRICS if metric_kind == kind]
+
+def metric_offsets(kind):
+    return [offset for offset, (metric_kind, _) in enumerate(METRICS) if metric_kind == kind]
+
+def to_day(text):
+    return np.datetime64(normalize_date(text), "D")
+
+# 日ごとの期間合計（first 日目以降の行、結果は (期間, 日, 社員, 件数の種類)）
+def window_sums(daily, windows, first=0):
+    base = max(first - max(windows) + 1, 0)
+    cumulative = np.concatenate([np.zeros_like(daily[:1]), np.cumsum(daily[base:], axis=0)])
+    rows = np.arange(first, len(daily)) - base
+    return np.stack([cumulative[rows + 1] - cumulative[np.maximum(rows + 1 - window, 0)] for window in windows])
+
+# 期間合計から率を計算（小数点第2位まで、持ち出し総数が0の場合は NaN）
+def rates(totals, counts, fulfillment=False):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = ((totals - counts) if fulfillment else counts) / totals * 100
+    return np.where(totals > 0, np.round(values, 2), np.nan)
+
+class RollingKPI:
+    def __init__(self, start, end, windows=WINDOWS):
+        if not windows or min(windows) < 1:
+            raise ValueError("集計する日数は1以上を指定してください")
+        self.windows = tuple(sorted(windows))
+        self.start = to_day(start)
+        # 最初の日の期間合計に必要な分だけ前の日から保持
+        self.origin = self.start - (self.windows[-1] - 1)
+        self.employees = []
+        self.positions = {}
+        days = int((to_day(end) - self.origin).astype(int)) + 1
+        self.daily = np.zeros((days, 0, len(METRICS)), dtype=np.int64)
+        self.sums = np.zeros((len(self.windows), days, 0, len(METRICS)), dtype=np.int64)
+
+    @property
+    def end(self):
+        return self.origin + (len(self.daily) - 1)
+
+    # 社員の列を追加（既存の日の件数は0）
+    def add_employees(self, names):
+        names = [name for name in dict.fromkeys(names) if name not in self.positions]
+        if not names:
+            return
+        for name in names:
+            self.positions[name] = len(self.employees)
+            self.employees.append(name)
+        self.daily = np.pad(self.daily, ((0, 0), (0, len(names)), (0, 0)))
+        self.sums = np.pad(self.sums, ((0, 0), (0, 0), (0, len(names)), (0, 0)))
+
+    # 終了日を延長（追加した日の期間合計は直前の日から計算）
+    def extend_to(self, end):
+        added = int((to_day(end) - self.end).astype(int))
+        if added <= 0:
+            return
+        first = len(self.daily)
+        self.daily = np.pad(self.daily, ((0, added), (0, 0), (0, 0)))
+        self.sums = np.concatenate([self.sums, window_sums(self.daily, self.windows, first)], axis=1)
+
+    # ストアから期間内の日別の件数を読み込み、全ての日の期間合計を計算
+    def load(self, refresh=True, store_path=DATA_STORE_PATH):
+        first_day = str(self.origin)
+        last_day = str(self.end)
+        frames = []
+        with closing(connect(store_path)) as conn, span("kpi:load", start=first_day, end=last_day) as fields:
+            for kind in LAYOUTS:
+                if refresh:
+                    refresh_range(conn, kind, first_day, last_day)
+                employee = quote(LAYOUTS[kind]["employee_column"])
+                sums = ", ".join(f"SUM({quote(column)})" for column in metric_columns(kind))
+                frame = pd.read_sql_query(
+                    f"SELECT 日付, {employee} AS 社員, {sums} FROM {quote(kind)} "
+                    f"WHERE 日付 BETWEEN ? AND ? AND {employee} IS NOT NULL GROUP BY 日付, {employee}",
+                    conn, params=(first_day, last_day))
+                frames.append((kind, frame))
+            fields["rows"] = sum(len(frame) for _, frame in frames)
+
+        with span("kpi:window_sums", days=len(self.daily)):
+            self.add_employees(sorted(set().union(*(frame["社員"] for _, frame in frames))))
+            daily = np.zeros_like(self.daily)
+            for kind, frame in frames:
+                days = (frame["日付"].to_numpy(dtype="datetime64[D]") - self.origin).astype(int)
+                people = frame["社員"].map(self.positions).to_numpy()
+                daily[days[:, None], people[:, None], metric_offsets(kind)] = frame.iloc[:, 2:].fillna(0).to_numpy(dtype=np.int64)
+            self.daily = daily
+            self.sums = window_sums(daily, self.windows)
+        return self
+
+    # 保存された1日分で更新（その日の件数を差し替え、その日を含む期間の合計だけを加減）
+    # 保持している期間より前の日は対象外として False を返す
+    def update_day(self, kind, date, df):
+        day = to_day(date)
+        if day < self.origin:
+            return False
+        self.extend_to(str(day))
+        employee = LAYOUTS[kind]["employee_column"]
+        totals = df.groupby(df[employee].astype(str))[metric_columns(kind)].sum()
+        self.add_employees(totals.index)
+
+        index = int((day - self.origin).astype(int))
+        offsets = metric_offsets(kind)
+        row = np.zeros((len(self.employees), len(offsets)), dtype=np.int64)
+        row[totals.index.map(self.positions).to_numpy()] = totals.fillna(0).to_numpy(dtype=np.int64)
+        delta = row - self.daily[index][:, offsets]
+        self.daily[index][:, offsets] = row
+        for position, window in enumerate(self.windows):
+            self.sums[position, index:index + window][:, :, offsets] += delta
+        return True
+
+    # 日付・社員ごとの率（社員ごとの行の後に全体の行、期間内にデータがない社員の行は含めない）
+    def frame(self, start=None, end=None, employees=None):
+        first = int(((to_day(start) if start else self.start) - self.origin).astype(int))
+        last = int(((to_day(end) if end else self.end) - self.origin).astype(int))
+        sums = self.sums[:, max(first, 0):last + 1]
+        totals = sums.sum(axis=2, keepdims=True)
+        names = list(self.employees)
+        if employees:
+            selected = [self.positions[name] for name in employees if name in self.positions]
+            sums = sums[:, :, selected]
+            names = [self.employees[position] for position in selected]
+        values = np.concatenate([sums, totals], axis=2)
+        names.append(TOTAL_NAME)
+
+        dates = np.datetime_as_string(self.origin + np.arange(max(first, 0), last + 1))
+        data = {"日付": np.repeat(dates, len(names)), "社員": np.tile(np.array(names, dtype=object), len(dates))}
+        for position, window in enumerate(self.windows):
+            data[f"誤配率_{window}日"] = rates(values[position, :, :, 0], values[position, :, :, 1]).ravel()
+            data[f"履行率_{window}日"] = rates(values[position, :, :, 2], values[position, :, :, 3], fulfillment=True).ravel()
+        df = pd.DataFrame(data)
+        rate_columns = df.columns[2:]
+        return df[df[rate_columns].notna().any(axis=1)].reset_index(drop=True)
+
+# 期間内の全ての日の移動集計
+def rolling_kpis(start, end, windows=WINDOWS, employees=None, refresh=True, store_path=DATA_STORE_PATH):
+    engine = RollingKPI(start, end, windows).load(refresh, store_path)
+    return engine.frame(employees=employees)
+
+# 移動集計のExcel出力（率の列は % の表示形式）
+def write_kpis(df, output_path):
+    formats = {col_idx: {"num_format": RATE_FORMAT} for col_idx in range(2, len(df.columns))}
+    with span("io:ExcelWriter", path=output_path, rows=len(df)), StreamingWorkbook(output_path) as workbook:
+        workbook.add_sheet(df.columns, "移動集計", column_formats=formats).write_dataframe(df)
@@ -0,0 +1,68 @@
+from contextlib import closing
+import pandas as pd
+from 設定 import DATA_STORE_PATH
+from データストア import LAYOUTS, connect, quote
+from 期間集計 import normalize_date, refresh_range
+from 計測 import span
+
+# 誤配管理と履行率管理の (日付, 社員) ごとの統合
+# 両方のテーブルを (日付, 社員) インデックスで期間内の行だけ読み、1つのクエリで社員名を揃えて合算する
+# どちらかのデータしかない日は、もう一方の列が空欄になる
+
+# 統合表の件数の列（種別, 元の列名, 統合表の列名）
+# 持ち出し総数は両方で別々に記録されているため、履行率管理側は列名を分ける
+COMBINED_COUNTS = [
+    ("誤配管理", "午前の持ち出し個数", "午前の持ち出し個数"),
+    ("誤配管理", "午後の持ち出し個数", "午後の持ち出し個数"),
+    ("誤配管理", "持ち出し総数", "持ち出し総数"),
+    ("誤配管理", "誤配数", "誤配数"),
+    ("履行率管理", "持ち出し総数", "履行率管理の持ち出し総数"),
+    ("履行率管理", "不履行数", "不履行数"),
+    ("履行率管理", "クレーム", "クレーム"),
+    ("履行率管理", "誤配", "誤配"),
+    ("履行率管理", "遅刻", "遅刻"),
+    ("履行率管理", "事故", "事故"),
+]
+
+# 統合表の列（率は件数の合計から計算）
+COMBINED_COLUMNS = ["日付", "社員", "午前の持ち出し個数", "午後の持ち出し個数", "持ち出し総数", "誤配数", "誤配率",
+                    "履行率管理の持ち出し総数", "不履行数", "クレーム", "誤配", "遅刻", "事故", "履行率"]
+
+# 種別ごとの期間内の行（統合表の列名に揃え、もう一方の種別の列は NULL）
+def kind_rows(kind, employees):
+    employee = quote(LAYOUTS[kind]["employee_column"])
+    values = ", ".join(f"{quote(column) if row_kind == kind else 'NULL'} AS {quote(name)}"
+                       for row_kind, column, name in COMBINED_COUNTS)
+    query = f"SELECT 日付, {employee} AS 社員, {values} FROM {quote(kind)} WHERE 日付 BETWEEN ? AND ? AND {employee} IS NOT NULL"
+    if employees:
+        query += f" AND {employee} IN ({', '.join('?' for _ in employees)})"
+    return query
+
+# 率（小数点第2位まで、持ち出し総数が0またはデータがない場合は空欄）
+def rate(counts, totals):
+    return (counts / totals * 100).round(2).where(totals > 0)
+
+# 期間内の社員ごとの統合表（by_day=True は日付・社員ごと、False は期間の合計と出勤日数）
+def combined_kpis(start, end, employees=None, by_day=True, refresh=True, store_path=DATA_STORE_PATH):
+    start, end = normalize_date(start), normalize_date(end)
+    employees = list(employees or [])
+    names = [name for _, _, name in COMBINED_COUNTS]
+    sums = ", ".join(f"SUM({quote(name)}) AS {quote(name)}" for name in names)
+    keys = "日付, 社員" if by_day else "社員"
+    days = "" if by_day else ", COUNT(DISTINCT 日付) AS 日数"
+    query = (f"SELECT {keys}, {sums}{days} FROM ({' UNION ALL '.join(kind_rows(kind, employees) for kind in LAYOUTS)}) "
+             f"GROUP BY {keys} ORDER BY {keys}")
+    params = [value for _ in LAYOUTS for value in (start, end, *employees)]
+
+    with closing(connect(store_path)) as conn, span("combined:query", start=start, end=end, by_day=by_day) as fields:
+        if refresh:
+            for kind in LAYOUTS:
+                refresh_range(conn, kind, start, end)
+        df = pd.read_sql_query(query, conn, params=params)
+        fields["rows"] = len(df)
+
+    df[names] = df[names].astype("Int64")
+    df["誤配率"] = rate(df["誤配数"], df["持ち出し総数"])
+    df["履行率"] = rate(df["履行率管理の持ち出し総数"] - df["不履行数"], df["履行率管理の持ち出し総数"])
+    columns = COMBINED_COLUMNS if by_day else [*COMBINED_COLUMNS[1:], "日数"]
+    return df[columns]
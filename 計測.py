@@ -0,0 +1,93 @@
+import os
+import json
+import time
+import atexit
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from datetime import datetime
+from 設定 import LOCAL_DATA_DIRECTORY
+
+# 処理時間の計測（既定では無効）
+# 環境変数 SAGAWA_TRACE（出力先のパス、または 1）か 集計コマンド の --trace で有効になり、
+# 終了時に Chrome のトレース形式（chrome://tracing や Perfetto で表示可能）のJSONを出力する
+
+_events = []
+_lock = threading.Lock()
+_trace_path = None
+
+# 計測中かどうか
+def enabled():
+    return _trace_path is not None
+
+# トレースの出力先（計測していない場合は None）
+def trace_path():
+    return _trace_path
+
+# 計測を開始（path を省略した場合はローカル保存先に日時付きのファイル名で出力）
+def enable(path=None):
+    global _trace_path
+    if path is None or path in ("1", "true", "yes"):
+        path = os.path.join(LOCAL_DATA_DIRECTORY, f"トレース_{datetime.now():%Y%m%d_%H%M%S}.json")
+    if _trace_path is None:
+        atexit.register(write_trace)
+    _trace_path = path
+    return path
+
+# 計測区間（fields に追加した値は行数などの付加情報として記録される）
+@contextmanager
+def span(name, **fields):
+    if _trace_path is None:
+        yield fields
+        return
+    start = time.perf_counter_ns()
+    try:
+        yield fields
+    finally:
+        end = time.perf_counter_ns()
+        record({
+            "name": name,
+            "cat": name.split(":")[0],
+            "ph": "X",
+            "ts": start / 1000,
+            "dur": (end - start) / 1000,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": {key: str(value) if not isinstance(value, (int, float, bool)) else value
+                     for key, value in fields.items()},
+        })
+
+def record(*events):
+    with _lock:
+        _events.extend(events)
+
+# プロセスプールのワーカーで reader を計測しながら実行し、結果と記録した区間を返す
+# （子プロセスの記録は親プロセスへ戻して1つのトレースにまとめる）
+def call_traced(reader, trace_path, file_path):
+    global _trace_path
+    _trace_path = trace_path
+    with _lock:
+        del _events[:]
+    result = reader(file_path)
+    with _lock:
+        events = list(_events)
+        del _events[:]
+    return result, events
+
+# 記録した区間の出力
+def write_trace(path=None):
+    path = path or _trace_path
+    if path is None:
+        return None
+    with _lock:
+        events = list(_events)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file, ensure_ascii=False)
+    return path
+
+# 子プロセスは call_traced で記録を親プロセスへ戻すため、環境変数では有効にしない
+if os.environ.get("SAGAWA_TRACE") and multiprocessing.parent_process() is None:
+    enable(os.environ["SAGAWA_TRACE"])
@@ -0,0 +1,18 @@
+import os
+
+# ローカル保存先（キャッシュなど、OneDriveで同期しないファイルの置き場所）
+LOCAL_DATA_DIRECTORY = os.environ.get("SAGAWA_LOCAL_DATA_DIR") or os.path.join(
+    os.environ.get("LOCALAPPDATA") or os.path.expanduser("~"), "佐川急便管理")
+
+# 日次ファイルごとの部分集計キャッシュ
+SUMMARY_CACHE_PATH = os.path.join(LOCAL_DATA_DIRECTORY, "集計キャッシュ.json")
+
+# 日次データの高速読み込み用ストア（Excelと同じ行を保持）
+DATA_STORE_PATH = os.path.join(LOCAL_DATA_DIRECTORY, "データストア.sqlite3")
+
+# 誤配管理データ（年/月フォルダ）の保存先
+MISDELIVERY_BASE_DIRECTORY = 'C:\\Users\\Owner\\OneDrive\\デスクトップ\\誤配管理'
+
+# 履行率管理データの保存先と社員名簿
+FULFILLMENT_BASE_DIRECTORY = "C:/Users/Owner/OneDrive/デスクトップ/佐川急便管理"
+FULFILLMENT_EMPLOYEE_LIST_PATH = r"C:\Users\Owner\OneDrive\デスクトップ\佐川急便管理\社員名.txt"
@@ -0,0 +1,28 @@
+import os
+import pandas as pd
+from データストア import save_day
+
+# 日次ファイルのパス（年/月フォルダの下）
+def misdelivery_file_path(base_directory, year, month, day):
+    return os.path.join(base_directory, year, month, f"誤配管理_{year}_{month}_{day}.xlsx")
+
+# 入力表の行（社員, 午前, 午後, 誤配数）から保存用のDataFrameを作成
+def build_misdelivery_frame(rows):
+    data = []
+    for employee_name, morning, afternoon, error in rows:
+        total_delivery = morning + afternoon
+        error_rate = (error / total_delivery * 100) if total_delivery > 0 else 0
+
+        data.append({
+            "社員": employee_name,
+            "午前の持ち出し個数": morning,
+            "午後の持ち出し個数": afternoon,
+            "持ち出し総数": total_delivery,
+            "誤配数": error,
+            "誤配率 (%)": round(error_rate, 2)
+        })
+    return pd.DataFrame(data)
+
+# 1日分の保存（修正モードはデータを上書き、それ以外は既存データに追加）
+def save_misdelivery_day(file_path, date, df, mode=None):
+    return save_day("誤配管理", "置換" if mode == "修正" else "追加", file_path, date, df)
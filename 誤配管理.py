@@ -1,11 +1,29 @@
 import sys
 import os
-import pandas as pd
+from 計測 import span
+from 遅延読込 import lazy_module, preload_after_show
 from PyQt5.QtWidgets import (QApplication, QWidget, QVBoxLayout, QLabel, QPushButton, 
                              QComboBox, QMessageBox, QLineEdit, QHBoxLayout, QDialog, 
                              QDialogButtonBox, QTableView, QAbstractItemView)
 from PyQt5.QtCore import QDate, Qt
-from PyQt5.QtGui import QFont, QStandardItemModel, QStandardItem, QIntValidator
+from PyQt5.QtGui import QFont, QIntValidator
+from データモデル import DataFrameTableModel
+from 入力グリッド import EntryGrid
+from 社員名簿 import get_roster
+from 保存ワーカー import start_save, save_error_message
+
+# pandas を含むモジュールは最初に使う時か画面の表示後に読み込む
+pd = lazy_module("pandas")
+データストア = lazy_module("データストア")
+誤配処理 = lazy_module("誤配処理")
+ジャーナル = lazy_module("ジャーナル")
+
+# データの保存先（アプリケーションのディレクトリ）と社員名簿
+BASE_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+EMPLOYEE_LIST_PATH = os.path.join(BASE_DIRECTORY, "社員名.txt")
+
+# 入力表の列（社員ごとの入力項目）
+ENTRY_COLUMNS = ["社員", "午前の持ち出し個数", "午後の持ち出し個数", "誤配数"]
 
 class AttendanceApp(QWidget):
     def __init__(self):
@@ -76,18 +94,19 @@ class AttendanceApp(QWidget):
             QMessageBox.critical(self, "入力エラー", "出勤人数は正の整数で入力してください。")
             return
 
+        # 社員名簿がなければ入力画面を開かない
+        if not os.path.exists(EMPLOYEE_LIST_PATH):
+            QMessageBox.critical(self, "エラー", "社員名.txtが見つかりません。")
+            return
+
         year = self.year_combobox.currentText()
         month = self.month_combobox.currentText()
         day = self.day_combobox.currentText()
-        date = f"{year}_{month}_{day}"
-
-        file_name = f"誤配管理_{date}.xlsx"
 
         # アプリケーションのディレクトリからの相対パスを使用
-        base_directory = os.path.dirname(os.path.abspath(__file__))
-        file_path = os.path.join(base_directory, year, month, file_name)
+        file_path = 誤配処理.misdelivery_file_path(BASE_DIRECTORY, year, month, day)
 
-        if os.path.exists(file_path):
+        if ジャーナル.day_exists(file_path):
             self.show_modify_append_dialog(file_path)
         else:
             self.show_attendance_input()
@@ -123,21 +142,15 @@ class AttendanceApp(QWidget):
         dialog.exec_()
 
     def view_existing_data(self, layout, file_path):
-        df = pd.read_excel(file_path)
-
-        table_view = QTableView()
-        model = QStandardItemModel()
-
-        for column in df.columns:
-            model.setHorizontalHeaderItem(df.columns.get_loc(column), QStandardItem(column))
-
-        for row in df.itertuples(index=False):
-            items = [QStandardItem(str(item)) for item in row]
-            model.appendRow(items)
+        with span("gui:view_existing_data", path=file_path) as fields:
+            df = データストア.read_workbook("誤配管理", file_path)
+            fields["rows"] = len(df)
 
-        table_view.setModel(model)
-        table_view.setEditTriggers(QAbstractItemView.NoEditTriggers)
-        table_view.resizeColumnsToContents()
+            # DataFrameを直接参照するモデル（表示される行だけを描画、列幅は最初に読み込んだ行で調整）
+            table_view = QTableView()
+            table_view.setModel(DataFrameTableModel(df, table_view))
+            table_view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+            table_view.resizeColumnsToContents()
 
         layout.addWidget(table_view)
 
@@ -181,18 +194,16 @@ class InputWindow(QWidget):
         self.parent = parent  # 親ウィンドウを保持
         self.font = QFont("Arial", 12)
         self.employee_list = self.load_employee_list()
-        self.employee_inputs = []
+        self.entry_grid = None
         self.init_ui()
 
     def load_employee_list(self):
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        file_path = os.path.join(script_dir, "社員名.txt")
-        if os.path.exists(file_path):
-            with open(file_path, "r", encoding="utf-8") as file:
-                return [line.strip() for line in file.readlines()]
-        else:
+        # 社員名簿は共有され、ファイルが更新された時だけ読み直される
+        try:
+            return get_roster(EMPLOYEE_LIST_PATH).get_names()
+        except FileNotFoundError:
             QMessageBox.critical(self, "エラー", "社員名.txtが見つかりません。")
-            sys.exit()
+            return []
 
     def init_ui(self):
         self.setWindowTitle("データ入力")
@@ -224,12 +235,15 @@ class InputWindow(QWidget):
         layout.addWidget(self.next_button)
 
     def load_existing_data(self, layout):
+        self.create_employee_grid(layout)
         if self.existing_file_path:
-            df = pd.read_excel(self.existing_file_path)
-            self.attendance = len(df)
+            with span("gui:load_existing_data", path=self.existing_file_path) as fields:
+                df = データストア.read_workbook("誤配管理", self.existing_file_path)
+                self.attendance = len(df)
+                fields["rows"] = self.attendance
 
-            for i, row in enumerate(df.itertuples(index=False)):
-                self.create_employee_input(layout, i, row)
+                counts = df[ENTRY_COLUMNS[1:]].apply(pd.to_numeric, errors="coerce").fillna(0).astype("int64")
+                self.entry_grid.entry_model.append_rows(zip(df["社員"], *(counts[column] for column in counts)))
 
         # 修正モード時に完了ボタンを追加
         if self.mode == "修正":
@@ -250,13 +264,17 @@ class InputWindow(QWidget):
             return
         
         self.attendance = int(self.attendance_input.text())
-        self.init_employee_input()
+        if self.entry_grid is None:
+            self.init_employee_input()
+        else:
+            self.entry_grid.request_row_count(self.attendance)
 
     def init_employee_input(self):
         layout = self.layout()
 
-        for i in range(self.attendance):
-            self.create_employee_input(layout, i)
+        self.create_employee_grid(layout)
+        self.entry_grid.entry_model.set_row_count(self.attendance)
+        self.attendance_input.textChanged.connect(self.update_employee_count)
 
         button_layout = QHBoxLayout()
         button_layout.addStretch(1)
@@ -276,105 +294,48 @@ class InputWindow(QWidget):
         layout.addLayout(button_layout)
         self.adjustSize()
 
-    def create_employee_input(self, layout, i, row=None):
-        emp_layout = QHBoxLayout()
-
-        emp_label = QLabel(f"社員 {i+1}:")
-        emp_label.setFont(self.font)
-        emp_layout.addWidget(emp_label)
-
-        employee_combobox = QComboBox()
-        employee_combobox.setFont(self.font)
-        employee_combobox.addItems(self.employee_list)
-        if row:
-            employee_combobox.setCurrentText(row.社員)
-        emp_layout.addWidget(employee_combobox)
-
-        morning_input = self.create_input_field("午前の持ち出し個数", self.font, emp_layout)
-        if row:
-            morning_input.setText(str(row.午前の持ち出し個数))
-
-        afternoon_input = self.create_input_field("午後の持ち出し個数", self.font, emp_layout)
-        if row:
-            afternoon_input.setText(str(row.午後の持ち出し個数))
-
-        error_input = self.create_input_field("誤配数", self.font, emp_layout)
-        if row:
-            error_input.setText(str(row.誤配数))
-
-        delete_button = QPushButton("削除")
-        delete_button.setFont(self.font)
-        delete_button.clicked.connect(lambda: self.delete_employee_input(emp_layout, i))
-        emp_layout.addWidget(delete_button)
-
-        self.employee_inputs.append((employee_combobox, morning_input, afternoon_input, error_input, emp_layout))
-        layout.addLayout(emp_layout)
-
-    def delete_employee_input(self, layout, index):
-        # リストから削除
-        if 0 <= index < len(self.employee_inputs):
-            for widget in self.employee_inputs[index][:-1]:  # レイアウト以外のウィジェットを削除
-                widget.deleteLater()
-            self.employee_inputs[index][-1].deleteLater()  # レイアウトを削除
-            self.employee_inputs.pop(index)
-
-        # ウィンドウサイズを内容に基づいて自動調整
-        self.adjustSize()
+    # 社員ごとの入力表と行削除ボタン
+    def create_employee_grid(self, layout):
+        self.entry_grid = EntryGrid(ENTRY_COLUMNS, self)
+        self.entry_grid.setFont(self.font)
+        self.entry_grid.set_employee_model(get_roster(EMPLOYEE_LIST_PATH).list_model())
+        layout.addWidget(self.entry_grid)
 
-    def create_input_field(self, label_text, font, layout):
-        label = QLabel(label_text)
-        label.setFont(font)
-        layout.addWidget(label)
-        line_edit = QLineEdit()
-        line_edit.setFont(font)
-        layout.addWidget(line_edit)
-        return line_edit
+        self.delete_button = QPushButton("選択した行を削除")
+        self.delete_button.setFont(self.font)
+        self.delete_button.clicked.connect(self.entry_grid.delete_selected_rows)
+        layout.addWidget(self.delete_button)
+
+    # 人数の変更（入力が落ち着いてから、増減した行だけを追加・削除）
+    def update_employee_count(self, text):
+        if text.isdigit() and int(text) > 0:
+            self.attendance = int(text)
+            self.entry_grid.request_row_count(self.attendance)
 
     def save_data(self):
-        data = []
-        for i in range(self.attendance):
-            if i < len(self.employee_inputs):
-                employee_name = self.employee_inputs[i][0].currentText()
-                morning = int(self.employee_inputs[i][1].text() or '0')
-                afternoon = int(self.employee_inputs[i][2].text() or '0')
-                error = int(self.employee_inputs[i][3].text() or '0')
-
-                total_delivery = morning + afternoon
-                error_rate = (error / total_delivery * 100) if total_delivery > 0 else 0
-
-                data.append({
-                    "社員": employee_name,
-                    "午前の持ち出し個数": morning,
-                    "午後の持ち出し個数": afternoon,
-                    "持ち出し総数": total_delivery,
-                    "誤配数": error,
-                    "誤配率 (%)": f"{error_rate:.2f}%"
-                })
-
-        df = pd.DataFrame(data)
-        file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), self.year, self.month, f"誤配管理_{self.year}_{self.month}_{self.day}.xlsx")
-
-        if not os.path.exists(os.path.dirname(file_path)):
-            os.makedirs(os.path.dirname(file_path))
-
-        if os.path.exists(file_path):
-            existing_df = pd.read_excel(file_path)
-            if self.mode == "修正":
-                # 修正モードの場合、データを上書き
-                df = pd.concat([existing_df.iloc[:0], df], ignore_index=True)
-            else:
-                df = pd.concat([existing_df, df], ignore_index=True)
-
-        with pd.ExcelWriter(file_path, engine='xlsxwriter') as writer:
-            df.to_excel(writer, index=False)
-            worksheet = writer.sheets['Sheet1']
-            for column in df:
-                column_width = 20
-                col_idx = df.columns.get_loc(column)
-                worksheet.set_column(col_idx, col_idx, column_width)
-        
+        df = 誤配処理.build_misdelivery_frame(self.entry_grid.row_values())
+        file_path = 誤配処理.misdelivery_file_path(BASE_DIRECTORY, self.year, self.month, self.day)
+        date = f"{self.year}-{self.month}-{self.day}"
+
+        # 既存データとの結合とExcelへの書き込みはバックグラウンドで実行
+        self.setEnabled(False)
+        start_save(self, 誤配処理.save_misdelivery_day, file_path, date, df, self.mode,
+                   on_finished=self.on_save_finished, on_failed=self.on_save_failed)
+
+    def on_save_finished(self, file_path):
+        self.setEnabled(True)
         QMessageBox.information(self, "保存完了", f"データが {file_path} に保存されました。")
-        QApplication.quit()  # 保存後にアプリケーションを終了
+        if QApplication.instance().property("resident"):
+            # ランチャーから起動した場合は誤配管理の画面だけを閉じる
+            self.close()
+            if self.parent is not None:
+                self.parent.close()
+        else:
+            QApplication.quit()  # 保存後にアプリケーションを終了
+
+    def on_save_failed(self, error):
+        self.setEnabled(True)
+        QMessageBox.critical(self, "保存エラー", save_error_message(error))
 
     def show_confirmation_dialog(self):
         confirmation = QMessageBox.question(
@@ -389,5 +350,6 @@ if __name__ == "__main__":
 
     window = AttendanceApp()
     window.show()
+    preload_after_show("誤配処理")
 
     sys.exit(app.exec_())
@@ -0,0 +1,48 @@
+import importlib
+import threading
+
+# 起動を速くするための遅延読み込み
+# pandas などの重いモジュールは最初に使う時に読み込み、画面の表示後にバックグラウンドで先読みする
+
+# 先読みするモジュール（Excelの読み書きに使うエンジンを含む）
+PRELOAD_MODULES = ["pandas", "openpyxl", "xlsxwriter"]
+
+# 画面の表示から先読みを始めるまでの時間（最初の描画を先に済ませる）
+PRELOAD_DELAY_MS = 100
+
+# 最初の属性参照でモジュールを読み込む代理オブジェクト
+# 先読み中に参照された場合は、import の仕組みにより読み込みの完了を待つ
+class LazyModule:
+    def __init__(self, name):
+        self.__dict__["_name"] = name
+
+    def __getattr__(self, attribute):
+        return getattr(importlib.import_module(self._name), attribute)
+
+def lazy_module(name):
+    return LazyModule(name)
+
+_preload_thread = None
+
+# バックグラウンドでの先読み（重いモジュールと、指定されたアプリのモジュール）
+def preload(*module_names):
+    global _preload_thread
+    if _preload_thread is not None:
+        return _preload_thread
+
+    def run():
+        for name in [*PRELOAD_MODULES, *module_names]:
+            try:
+                importlib.import_module(name)
+            except ImportError:
+                # 実際に使う時に改めてエラーになる
+                pass
+
+    _preload_thread = threading.Thread(target=run, name="先読み", daemon=True)
+    _preload_thread.start()
+    return _preload_thread
+
+# 画面の表示後に先読みを開始（イベントループの開始後に実行）
+def preload_after_show(*module_names):
+    from PyQt5.QtCore import QTimer
+    QTimer.singleShot(PRELOAD_DELAY_MS, lambda: preload(*module_names))
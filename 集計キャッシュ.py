@@ -0,0 +1,99 @@
+import os
+import json
+import threading
+import pandas as pd
+from 設定 import SUMMARY_CACHE_PATH
+from 並列読込 import read_workbooks
+from データストア import cache_key, file_signature, read_workbook
+from 計測 import span
+from スキーマ import SUMMARY_SCHEMA
+from Excel読込 import read_typed_excel
+
+# 集計対象の列
+SUM_COLUMNS = ['持ち出し総数', '誤配数']
+
+# 最後に読み書きしたキャッシュ（同じプロセスで再び集計する場合、ファイルが変わっていなければ読み直さない）
+# 集計ボタンと監視のスレッドなど複数のスレッドから使うため、呼び出し側にはそれぞれの複製を渡す
+# 各項目は置き換えるだけで変更しないため、複製は項目の辞書を共有してよい
+_loaded = {"path": None, "signature": None, "cache": None}
+_loaded_lock = threading.Lock()
+
+# キャッシュの読み込み（存在しない・壊れている場合は空のキャッシュ、呼び出し側で変更してよい複製を返す）
+def load_cache(cache_path=SUMMARY_CACHE_PATH):
+    try:
+        signature = file_signature(cache_path)
+        with _loaded_lock:
+            if _loaded["path"] == cache_path and _loaded["signature"] == signature:
+                return dict(_loaded["cache"])
+        with open(cache_path, "r", encoding="utf-8") as file:
+            cache = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(cache, dict):
+        return {}
+    with _loaded_lock:
+        _loaded.update(path=cache_path, signature=signature, cache=dict(cache))
+    return cache
+
+# キャッシュの保存（一時ファイルに書き込んでから置き換え、同じプロセス内の保存は1つずつ）
+def save_cache(cache, cache_path=SUMMARY_CACHE_PATH):
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    temp_path = f"{cache_path}.tmp"
+    with _loaded_lock:
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(cache, file, ensure_ascii=False)
+        os.replace(temp_path, cache_path)
+        _loaded.update(path=cache_path, signature=file_signature(cache_path), cache=dict(cache))
+
+# 日次ファイル1件分の社員ごとの部分集計（社員 → [持ち出し総数, 誤配数]、集計に使う列だけを読み込む）
+def summarize_daily_file(file_path):
+    df = read_workbook("誤配管理", file_path, columns=["社員", *SUM_COLUMNS])
+    with span("pandas:groupby", path=file_path, rows=len(df)):
+        partial = df.groupby("社員")[SUM_COLUMNS].sum()
+    return dict(zip(map(str, partial.index), partial.to_numpy().tolist()))
+
+# 月次集計ファイル1件分の社員ごとの合計（最後の全体の行は除く）
+def summarize_monthly_file(file_path):
+    with span("io:read_excel", path=file_path) as fields:
+        summary = read_typed_excel(file_path, SUMMARY_SCHEMA, ["社員", *SUM_COLUMNS])
+        fields["rows"] = len(summary)
+    summary = summary.iloc[:-1]
+    return dict(zip(summary['社員'], summary[SUM_COLUMNS].to_numpy().tolist()))
+
+# 各ファイルの部分集計を取得（変更・追加されたファイルのみ並列に再読み込み）
+def collect_partials(cache, file_paths, reader=summarize_daily_file, jobs=None, executor="thread"):
+    keys = [cache_key(file_path) for file_path in file_paths]
+    stale = []
+    with span("io:stat", files=len(file_paths)) as fields:
+        for file_path, key in zip(file_paths, keys):
+            signature = file_signature(file_path)
+            entry = cache.get(key)
+            if entry is None or entry["signature"] != signature:
+                stale.append((file_path, key, signature))
+        fields["stale"] = len(stale)
+
+    with span("io:read_workbooks", files=len(stale), executor=executor):
+        partials = read_workbooks([file_path for file_path, _, _ in stale], reader=reader, jobs=jobs, executor=executor)
+    for (_, key, signature), partial in zip(stale, partials):
+        cache[key] = {"signature": signature, "partial": partial}
+
+    return [cache[key]["partial"] for key in keys]
+
+# 集計に使った日次ファイルの識別情報（collect_partials 後のキャッシュから、キャッシュのキー → 識別情報）
+def source_signatures(cache, file_paths):
+    return {cache_key(file_path): cache[cache_key(file_path)]["signature"] for file_path in file_paths}
+
+# 作成した月次集計ファイルの記録（集計に使った日次ファイルの識別情報と社員ごとの合計）
+# 合計は部分集計として記録するため、積み上げ時に月次集計ファイルを読み直す必要もない
+def record_summary(cache, summary_path, sources, partial):
+    cache[cache_key(summary_path)] = {"signature": file_signature(summary_path), "partial": partial, "sources": sources}
+
+# 部分集計を社員ごとに合算（全ファイル分をまとめて一度だけ結合）
+def merge_partials(partials):
+    rows = [(name, *values) for partial in partials for name, values in partial.items()]
+    with span("pandas:merge_partials", rows=len(rows)):
+        merged = pd.DataFrame(rows, columns=["社員", *SUM_COLUMNS])
+        return merged.groupby("社員").agg({
+            '持ち出し総数': 'sum',
+            '誤配数': 'sum'
+        }).reset_index()
@@ -0,0 +1,321 @@
+import sys
+import json
+import argparse
+import 集計処理
+import 一括取込
+import 期間集計
+import 社員履歴
+import 移動集計
+import 統合集計
+import 月次監視
+import 計測
+from 設定 import MISDELIVERY_BASE_DIRECTORY
+
+# 終了コード
+EXIT_OK = 0
+EXIT_FAILURE = 1
+EXIT_USAGE = 2
+EXIT_PERMISSION = 3
+EXIT_NOT_FOUND = 4
+
+# 結果の出力（1件ごとに1行のJSON）
+def report(**fields):
+    print(json.dumps({"status": "ok", **fields}, ensure_ascii=False), flush=True)
+
+# 進捗の出力（標準エラーに1行のJSON）
+def report_progress(**fields):
+    print(json.dumps({"status": "progress", **fields}, ensure_ascii=False), file=sys.stderr, flush=True)
+
+# エラーの出力（標準エラーに1行のJSON）、対応する終了コードを返す
+def report_error(error, **fields):
+    print(json.dumps({"status": "error", **fields, "error": type(error).__name__, "message": str(error)},
+                     ensure_ascii=False), file=sys.stderr, flush=True)
+    if isinstance(error, PermissionError):
+        return EXIT_PERMISSION
+    if isinstance(error, FileNotFoundError):
+        return EXIT_NOT_FOUND
+    return EXIT_FAILURE
+
+# 月次・年次集計（--month を省略した場合は年フォルダ内の全ての月と年次集計）
+def command_aggregate(args):
+    options = {"jobs": args.jobs, "executor": args.executor}
+    yearly_options = {**options, "rollup": args.rollup}
+    exit_code = EXIT_OK
+
+    if args.month:
+        months = [month.zfill(2) for month in args.month]
+    else:
+        try:
+            months = sorted(集計処理.list_month_folders(args.base, args.year))
+        except Exception as e:
+            return report_error(e, report="yearly", year=args.year)
+
+    for month in months:
+        try:
+            output_path = 集計処理.monthly_aggregation(args.base, args.year, month, **options)
+            report(report="monthly", year=args.year, month=month, output=output_path)
+        except Exception as e:
+            code = report_error(e, report="monthly", year=args.year, month=month)
+            exit_code = exit_code or code
+
+    if args.yearly or not args.month:
+        try:
+            output_path = 集計処理.yearly_aggregation(args.base, args.year, **yearly_options)
+            report(report="yearly", year=args.year, output=output_path)
+        except Exception as e:
+            code = report_error(e, report="yearly", year=args.year)
+            exit_code = exit_code or code
+
+    return exit_code
+
+# 年間パック（年次・月別・社員別のシートを1つのファイルに出力）
+def command_pack(args):
+    try:
+        output_path = 集計処理.annual_pack(args.base, args.year, jobs=args.jobs, executor=args.executor)
+    except Exception as e:
+        return report_error(e, report="pack", year=args.year)
+    report(report="pack", year=args.year, output=output_path)
+    return EXIT_OK
+
+# 月次集計ファイルの自動更新（Ctrl+C で終了するまで、作り直すたびに1行出力）
+def command_watch(args):
+    def on_rewrite(year, month, output_path, files):
+        report(report="watch", year=year, month=month, output=output_path, files=files)
+
+    def on_error(year, month, file_path, error):
+        report_error(error, report="watch", year=year, month=month, path=file_path)
+
+    watcher = 月次監視.MonthlyWatcher(args.base, years=args.year, debounce=args.debounce,
+                                   on_rewrite=on_rewrite, on_error=on_error)
+    try:
+        watcher.run(interval=args.interval)
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        return report_error(e, report="watch")
+    return EXIT_OK
+
+# 過去の日次ファイルの一括取込（中断した場合は同じコマンドで続きから再開）
+def command_import(args):
+    def on_invalid(file_path, reason):
+        print(json.dumps({"status": "invalid", "path": file_path, "reason": reason}, ensure_ascii=False), flush=True)
+
+    try:
+        stats = 一括取込.import_directory(args.root, default_year=args.year, jobs=args.jobs, executor=args.executor,
+                                      batch_size=args.batch_size, progress=lambda stats: report_progress(**stats),
+                                      on_invalid=on_invalid)
+    except Exception as e:
+        return report_error(e, report="import", root=args.root)
+    report(report="import", root=args.root, **stats)
+    return EXIT_OK
+
+# 追記ジャーナルの圧縮（保存時にはジャーナルへの追記だけのため、まだExcelファイルに反映していない分を反映、夜間などに実行）
+def command_compact(args):
+    def on_compacted(file_path, rows):
+        print(json.dumps({"status": "compacted", "path": file_path, "rows": rows}, ensure_ascii=False), flush=True)
+
+    try:
+        stats = 一括取込.compact_directory(args.root, default_year=args.year, on_compacted=on_compacted)
+    except Exception as e:
+        return report_error(e, report="compact", root=args.root)
+    report(report="compact", root=args.root, **stats)
+    return EXIT_OK
+
+# 任意の期間の集計（ストアに登録済みのデータから集計、--output 指定時はExcelにも保存）
+def command_range(args):
+    try:
+        start, end = 期間集計.normalize_date(args.start), 期間集計.normalize_date(args.end)
+    except ValueError as e:
+        report_error(e, report="range", kind=args.kind)
+        return EXIT_USAGE
+
+    try:
+        summary = 期間集計.RANGE_AGGREGATIONS[args.kind](start, end, employees=args.employee, refresh=args.refresh)
+        if args.output:
+            集計処理.write_summary(summary, args.output)
+    except Exception as e:
+        return report_error(e, report="range", kind=args.kind)
+    report(report="range", kind=args.kind, start=start, end=end, output=args.output,
+           rows=summary.to_dict("records"))
+    return EXIT_OK
+
+# 期間内の明細をExcelへ出力（ストアから1行ずつ書き込み）
+def command_export(args):
+    try:
+        start, end = 期間集計.normalize_date(args.start), 期間集計.normalize_date(args.end)
+    except ValueError as e:
+        report_error(e, report="export", kind=args.kind)
+        return EXIT_USAGE
+
+    try:
+        rows = 期間集計.export_range(args.kind, start, end, args.output, employees=args.employee, refresh=args.refresh)
+    except Exception as e:
+        return report_error(e, report="export", kind=args.kind, output=args.output)
+    report(report="export", kind=args.kind, start=start, end=end, output=args.output, rows=rows)
+    return EXIT_OK
+
+# 社員の日別の履歴（--output 指定時はExcelにも保存）
+def command_history(args):
+    try:
+        history = 社員履歴.driver_history(args.employee, args.start, args.end, refresh=args.refresh)
+    except ValueError as e:
+        report_error(e, report="history", employee=args.employee)
+        return EXIT_USAGE
+    except Exception as e:
+        return report_error(e, report="history", employee=args.employee)
+
+    try:
+        if args.output:
+            集計処理.write_summary(history, args.output)
+    except Exception as e:
+        return report_error(e, report="history", employee=args.employee, output=args.output)
+    rows = history.astype(object).where(history.notna(), None).to_dict("records")
+    report(report="history", employee=args.employee, output=args.output, rows=rows)
+    return EXIT_OK
+
+# 誤配管理と履行率管理の統合表（--period 指定時は社員ごとの期間合計、--output 指定時はExcelにも保存）
+def command_combined(args):
+    try:
+        combined = 統合集計.combined_kpis(args.start, args.end, employees=args.employee, by_day=not args.period,
+                                      refresh=args.refresh)
+    except ValueError as e:
+        report_error(e, report="combined")
+        return EXIT_USAGE
+    except Exception as e:
+        return report_error(e, report="combined")
+
+    try:
+        if args.output:
+            集計処理.write_summary(combined, args.output)
+    except Exception as e:
+        return report_error(e, report="combined", output=args.output)
+    rows = combined.astype(object).where(combined.notna(), None).to_dict("records")
+    report(report="combined", start=args.start, end=args.end, output=args.output, rows=rows)
+    return EXIT_OK
+
+# 移動集計（期間内の全ての日の直近N日の誤配率・履行率、--output 指定時はExcelにも保存）
+# 結果の出力は最後の日の行のみ（全ての日は --output のファイルに保存）
+def command_kpi(args):
+    try:
+        kpis = 移動集計.rolling_kpis(args.start, args.end, windows=args.window or 移動集計.WINDOWS,
+                                  employees=args.employee, refresh=args.refresh)
+    except ValueError as e:
+        report_error(e, report="kpi")
+        return EXIT_USAGE
+    except Exception as e:
+        return report_error(e, report="kpi")
+
+    try:
+        if args.output:
+            移動集計.write_kpis(kpis, args.output)
+    except Exception as e:
+        return report_error(e, report="kpi", output=args.output)
+    latest = kpis[kpis["日付"] == kpis["日付"].max()] if len(kpis) else kpis
+    rows = latest.astype(object).where(latest.notna(), None).to_dict("records")
+    report(report="kpi", start=args.start, end=args.end, output=args.output, days=kpis["日付"].nunique(), latest=rows)
+    return EXIT_OK
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m 集計コマンド", description="誤配管理・履行率管理のデータ処理をGUIなしで実行します。")
+    parser.add_argument("--trace", nargs="?", const="1", metavar="PATH",
+                        help="処理時間のトレースをJSONで出力（PATH 省略時はローカル保存先に作成）")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    aggregate = subparsers.add_parser("aggregate", help="月次・年次集計を作成")
+    aggregate.add_argument("--base", default=MISDELIVERY_BASE_DIRECTORY, help="年/月フォルダがある保存先")
+    aggregate.add_argument("--year", required=True, help="対象の年（例: 2026）")
+    aggregate.add_argument("--month", action="append", help="対象の月（複数指定可、省略時は全ての月と年次集計）")
+    aggregate.add_argument("--yearly", action="store_true", help="--month 指定時にも年次集計を作成")
+    aggregate.add_argument("--no-rollup", dest="rollup", action="store_false",
+                           help="年次集計を月次集計ファイルを使わず全ての日次ファイルから作成")
+    aggregate.add_argument("--jobs", type=int, default=None, help="並列読み込みのワーカー数")
+    aggregate.add_argument("--executor", choices=["thread", "process"], default="thread", help="並列読み込みの方式")
+    aggregate.set_defaults(handler=command_aggregate)
+
+    pack = subparsers.add_parser("pack", help="年次・月別・社員別のシートを1つのファイルに出力")
+    pack.add_argument("--base", default=MISDELIVERY_BASE_DIRECTORY, help="年/月フォルダがある保存先")
+    pack.add_argument("--year", required=True, help="対象の年（例: 2026）")
+    pack.add_argument("--jobs", type=int, default=None, help="並列読み込みのワーカー数")
+    pack.add_argument("--executor", choices=["thread", "process"], default="thread", help="並列読み込みの方式")
+    pack.set_defaults(handler=command_pack)
+
+    watch = subparsers.add_parser("watch", help="日次ファイルの保存を監視し、月次集計ファイルを自動で作り直す")
+    watch.add_argument("--base", default=MISDELIVERY_BASE_DIRECTORY, help="年/月フォルダがある保存先")
+    watch.add_argument("--year", action="append", help="対象の年（複数指定可、省略時は今年）")
+    watch.add_argument("--interval", type=float, default=月次監視.POLL_INTERVAL, help="フォルダを確認する間隔（秒）")
+    watch.add_argument("--debounce", type=float, default=月次監視.DEBOUNCE_SECONDS,
+                       help="最後の保存から月次集計ファイルを作り直すまでの時間（秒）")
+    watch.set_defaults(handler=command_watch)
+
+    importer = subparsers.add_parser("import", help="過去の日次ファイルをデータストアへ一括取込")
+    importer.add_argument("root", help="取り込むフォルダ（サブフォルダも含む）")
+    importer.add_argument("--year", help="ファイル名・フォルダ名に年がない履行率管理ファイルの年")
+    importer.add_argument("--jobs", type=int, default=None, help="並列読み込みのワーカー数")
+    importer.add_argument("--executor", choices=["thread", "process"], default="process", help="並列読み込みの方式")
+    importer.add_argument("--batch-size", type=int, default=200, help="何ファイルごとにコミットするか（再開の単位）")
+    importer.set_defaults(handler=command_import)
+
+    compact = subparsers.add_parser("compact", help="まだ反映していない追記ジャーナルを日次ファイルへ反映")
+    compact.add_argument("root", help="対象のフォルダ（サブフォルダも含む）")
+    compact.add_argument("--year", help="ファイル名・フォルダ名に年がない履行率管理ファイルの年")
+    compact.set_defaults(handler=command_compact)
+
+    range_parser = subparsers.add_parser("range", help="任意の期間の集計（事前に import でストアへ登録）")
+    range_parser.add_argument("--kind", choices=list(期間集計.RANGE_AGGREGATIONS), default="誤配管理", help="集計するデータ")
+    range_parser.add_argument("--start", required=True, help="開始日（YYYY-MM-DD、この日を含む）")
+    range_parser.add_argument("--end", required=True, help="終了日（YYYY-MM-DD、この日を含む）")
+    range_parser.add_argument("--employee", action="append", help="対象の社員（複数指定可、省略時は全員）")
+    range_parser.add_argument("--output", help="集計結果を保存するExcelファイル")
+    range_parser.add_argument("--no-refresh", dest="refresh", action="store_false",
+                              help="期間内のファイルの変更を確認せず、ストアの内容だけで集計")
+    range_parser.set_defaults(handler=command_range)
+
+    export = subparsers.add_parser("export", help="期間内の明細をExcelへ出力（事前に import でストアへ登録）")
+    export.add_argument("--kind", choices=list(期間集計.RANGE_AGGREGATIONS), default="誤配管理", help="出力するデータ")
+    export.add_argument("--start", required=True, help="開始日（YYYY-MM-DD、この日を含む）")
+    export.add_argument("--end", required=True, help="終了日（YYYY-MM-DD、この日を含む）")
+    export.add_argument("--employee", action="append", help="対象の社員（複数指定可、省略時は全員）")
+    export.add_argument("--output", required=True, help="出力するExcelファイル")
+    export.add_argument("--no-refresh", dest="refresh", action="store_false",
+                        help="期間内のファイルの変更を確認せず、ストアの内容だけを出力")
+    export.set_defaults(handler=command_export)
+
+    history = subparsers.add_parser("history", help="社員の日別の履歴（事前に import でストアへ登録）")
+    history.add_argument("--employee", required=True, help="社員名")
+    history.add_argument("--start", required=True, help="開始日（YYYY-MM-DD、この日を含む）")
+    history.add_argument("--end", required=True, help="終了日（YYYY-MM-DD、この日を含む）")
+    history.add_argument("--output", help="履歴を保存するExcelファイル")
+    history.add_argument("--no-refresh", dest="refresh", action="store_false",
+                         help="期間内のファイルの変更を確認せず、ストアの内容だけで取得")
+    history.set_defaults(handler=command_history)
+
+    combined = subparsers.add_parser("combined", help="誤配管理と履行率管理を日付・社員ごとに統合（事前に import でストアへ登録）")
+    combined.add_argument("--start", required=True, help="開始日（YYYY-MM-DD、この日を含む）")
+    combined.add_argument("--end", required=True, help="終了日（YYYY-MM-DD、この日を含む）")
+    combined.add_argument("--employee", action="append", help="対象の社員（複数指定可、省略時は全員）")
+    combined.add_argument("--period", action="store_true", help="日ごとではなく社員ごとの期間合計と出勤日数を出力")
+    combined.add_argument("--output", help="統合表を保存するExcelファイル")
+    combined.add_argument("--no-refresh", dest="refresh", action="store_false",
+                          help="期間内のファイルの変更を確認せず、ストアの内容だけで集計")
+    combined.set_defaults(handler=command_combined)
+
+    kpi = subparsers.add_parser("kpi", help="直近7・30・90日の誤配率・履行率を日ごとに集計（事前に import でストアへ登録）")
+    kpi.add_argument("--start", required=True, help="開始日（YYYY-MM-DD、この日を含む）")
+    kpi.add_argument("--end", required=True, help="終了日（YYYY-MM-DD、この日を含む）")
+    kpi.add_argument("--window", type=int, action="append", help="集計する日数（複数指定可、省略時は 7・30・90）")
+    kpi.add_argument("--employee", action="append", help="対象の社員（複数指定可、省略時は全員、全体の行は常に出力）")
+    kpi.add_argument("--output", help="結果を保存するExcelファイル")
+    kpi.add_argument("--no-refresh", dest="refresh", action="store_false",
+                     help="期間内のファイルの変更を確認せず、ストアの内容だけで集計")
+    kpi.set_defaults(handler=command_kpi)
+
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.trace:
+        計測.enable(args.trace)
+    return args.handler(args)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,200 @@
+import os
+import pandas as pd
+from 集計キャッシュ import (SUM_COLUMNS, load_cache, save_cache, collect_partials, merge_partials, record_summary,
+                     source_signatures, summarize_monthly_file)
+from 計測 import span
+from データストア import cache_key, file_signature
+from ジャーナル import with_journal_days
+from Excel出力 import StreamingWorkbook, write_excel_atomic
+
+# 集計表の列
+SUMMARY_HEADERS = ['社員', '持ち出し総数', '誤配数', '誤配率']
+
+# 誤配率の計算関数
+def calculate_misdelivery_rate(total_deliveries, total_misdeliveries):
+    if total_deliveries == 0:
+        return 0
+    return (total_misdeliveries / total_deliveries) * 100
+
+# Excelでファイルを開いている間、同じフォルダに作られる所有者ファイルの接頭辞（日次ファイルではない）
+EXCEL_OWNER_PREFIX = "~$"
+
+# 月フォルダ内の日次ファイル一覧（既存の月次集計ファイルとExcelの所有者ファイルは除外、ジャーナルだけがある日も含む）
+def list_month_files(base_directory, year, month):
+    month_folder = os.path.join(base_directory, year, month)
+    with span("io:listdir", path=month_folder):
+        return [os.path.join(month_folder, filename) for filename in with_journal_days(os.listdir(month_folder))
+                if filename.endswith(".xlsx") and not filename.startswith(f"{year}_{month}_月次集計")
+                and not filename.startswith(EXCEL_OWNER_PREFIX)]
+
+# 年フォルダ内の月フォルダ一覧
+def list_month_folders(base_directory, year):
+    year_folder = os.path.join(base_directory, year)
+    return [month for month in os.listdir(year_folder) if os.path.isdir(os.path.join(year_folder, month))]
+
+# 年フォルダ内の日次ファイル一覧（既存の集計ファイルとExcelの所有者ファイルは除外、ジャーナルだけがある日も含む）
+def list_year_files(base_directory, year):
+    file_paths = []
+    with span("io:listdir", path=os.path.join(base_directory, year)) as fields:
+        for month in list_month_folders(base_directory, year):
+            month_folder = os.path.join(base_directory, year, month)
+            for filename in with_journal_days(os.listdir(month_folder)):
+                if (filename.endswith(".xlsx") and not filename.startswith(f"{year}_") and not filename.endswith("月次集計.xlsx")
+                        and not filename.startswith(EXCEL_OWNER_PREFIX)):
+                    file_paths.append(os.path.join(month_folder, filename))
+        fields["files"] = len(file_paths)
+    return file_paths
+
+# 日次ファイルの社員ごとの合計（変更・追加されたファイルのみ読み込み、キャッシュ済みの部分集計と合算）
+def aggregate_files(file_paths, jobs=None, executor="thread"):
+    with span("cache:load"):
+        cache = load_cache()
+    partials = collect_partials(cache, file_paths, jobs=jobs, executor=executor)
+    with span("cache:save", entries=len(cache)):
+        save_cache(cache)
+    return merge_partials(partials)
+
+# 月次集計ファイルのパス
+def monthly_summary_path(base_directory, year, month):
+    return os.path.join(base_directory, year, month, f"{year}_{month}_月次集計.xlsx")
+
+# 月次集計ファイルが最新かどうか
+# 作成時にキャッシュへ記録した日次ファイルの構成と識別情報が今と同じで、月次集計ファイルも作成後に置き換えられていないこと
+# （月フォルダの更新時刻は一時ファイルやロックファイルの作成・削除でも変わるため使わない）
+def is_summary_fresh(cache, summary_path, file_paths):
+    entry = cache.get(cache_key(summary_path))
+    if entry is None or "sources" not in entry:
+        return False
+    try:
+        if entry["signature"] != file_signature(summary_path):
+            return False
+        return entry["sources"] == {cache_key(file_path): file_signature(file_path) for file_path in file_paths}
+    except FileNotFoundError:
+        return False
+
+# 月の日次ファイルを集計して月次集計ファイルを作成し、キャッシュに記録（社員ごとの合計を返す）
+def write_month(cache, file_paths, summary_path, jobs=None, executor="thread"):
+    monthly_total = merge_partials(collect_partials(cache, file_paths, jobs=jobs, executor=executor))
+    write_summary(build_summary(monthly_total.copy()), summary_path)
+    partial = dict(zip(monthly_total['社員'], monthly_total[SUM_COLUMNS].to_numpy().tolist()))
+    record_summary(cache, summary_path, source_signatures(cache, file_paths), partial)
+    return partial
+
+# 社員ごとの誤配率と全体の行を追加した集計表
+def build_summary(total):
+    # 全体の持ち出し総数と誤配数の計算
+    total_deliveries = total['持ち出し総数'].sum()
+    total_misdeliveries = total['誤配数'].sum()
+    overall_misdelivery_rate = calculate_misdelivery_rate(total_deliveries, total_misdeliveries)
+
+    # 社員ごとの誤配率の計算
+    total['誤配率'] = total.apply(
+        lambda x: calculate_misdelivery_rate(x['持ち出し総数'], x['誤配数']), axis=1
+    )
+    total['誤配率'] = total['誤配率'].round(2)
+
+    # 全体の誤配率の行を追加
+    overall_row = pd.DataFrame({
+        '社員': ['全体'],
+        '持ち出し総数': [total_deliveries],
+        '誤配数': [total_misdeliveries],
+        '誤配率': [round(overall_misdelivery_rate, 2)]
+    })
+    return pd.concat([total, overall_row], ignore_index=True)
+
+# 集計表の保存
+def write_summary(summary, output_path):
+    write_excel_atomic(summary, output_path, column_width=20)  # 列幅を20に固定
+
+# 月次集計機能（社員ごとの総持ち出し総数と総誤配数、全体の総誤配率の計算）
+def monthly_aggregation(base_directory, year, month, jobs=None, executor="thread"):
+    with span("aggregate:monthly_aggregation", year=year, month=month):
+        file_paths = list_month_files(base_directory, year, month)
+        output_path = monthly_summary_path(base_directory, year, month)
+        with span("cache:load"):
+            cache = load_cache()
+        write_month(cache, file_paths, output_path, jobs, executor)
+        with span("cache:save", entries=len(cache)):
+            save_cache(cache)
+        return output_path
+
+# 月次集計を積み上げた社員ごとの年間合計
+# 最新の月次集計ファイルはそのまま読み込み、古い・存在しない月だけ日次ファイルから集計して月次集計ファイルも更新する
+def rollup_months(base_directory, year, jobs=None, executor="thread"):
+    with span("cache:load"):
+        cache = load_cache()
+
+    partials = []
+    summary_paths = []
+    for month in sorted(list_month_folders(base_directory, year)):
+        file_paths = list_month_files(base_directory, year, month)
+        if not file_paths:
+            continue
+        summary_path = monthly_summary_path(base_directory, year, month)
+        if is_summary_fresh(cache, summary_path, file_paths):
+            summary_paths.append(summary_path)
+            continue
+        with span("rollup:stale_month", year=year, month=month):
+            partials.append(write_month(cache, file_paths, summary_path, jobs, executor))
+
+    # 最新の月次集計ファイルは作成時に記録した合計を使用（記録が古い場合のみ月ごとに1件の小さな読み込み）
+    with span("rollup:summaries", files=len(summary_paths)):
+        partials += collect_partials(cache, summary_paths, reader=summarize_monthly_file, jobs=jobs, executor=executor)
+
+    with span("cache:save", entries=len(cache)):
+        save_cache(cache)
+    return merge_partials(partials)
+
+# 年次集計機能（社員ごとの総持ち出し総数と総誤配数、全体の総誤配率の計算）
+# rollup=True の場合は月次集計ファイルを積み上げ、False の場合は全ての日次ファイルから集計
+def yearly_aggregation(base_directory, year, jobs=None, executor="thread", rollup=True):
+    with span("aggregate:yearly_aggregation", year=year, rollup=rollup):
+        if rollup:
+            yearly_total = build_summary(rollup_months(base_directory, year, jobs, executor))
+        else:
+            file_paths = list_year_files(base_directory, year)
+            yearly_total = build_summary(aggregate_files(file_paths, jobs, executor))
+
+        output_path = os.path.join(base_directory, year, f"{year}_年次集計.xlsx")
+        write_summary(yearly_total, output_path)
+        return output_path
+
+# 年間パック（年次・月別・社員別のシートを1つのファイルに出力）
+# 日次ファイルは1回だけ読み込み（変更のないファイルはキャッシュを使用）、全てのシートを同じ集計結果から作成
+def annual_pack(base_directory, year, jobs=None, executor="thread"):
+    with span("aggregate:annual_pack", year=year):
+        months = []
+        file_paths = []
+        for month in sorted(list_month_folders(base_directory, year)):
+            month_files = list_month_files(base_directory, year, month)
+            months += [month] * len(month_files)
+            file_paths += month_files
+
+        with span("cache:load"):
+            cache = load_cache()
+        partials = collect_partials(cache, file_paths, jobs=jobs, executor=executor)
+        with span("cache:save", entries=len(cache)):
+            save_cache(cache)
+
+        # 月・社員ごとの合計（全てのシートの元になる表）
+        with span("pandas:annual_pack_groupby", files=len(file_paths)):
+            rows = [(month, name, *values) for month, partial in zip(months, partials) for name, values in partial.items()]
+            detail = pd.DataFrame(rows, columns=['月', '社員', *SUM_COLUMNS])
+            monthly = detail.groupby(['月', '社員'], as_index=False)[SUM_COLUMNS].sum()
+            yearly = monthly.groupby('社員', as_index=False)[SUM_COLUMNS].sum()
+
+        output_path = os.path.join(base_directory, year, f"{year}_年間集計.xlsx")
+        with span("io:ExcelWriter", path=output_path, rows=len(monthly)), StreamingWorkbook(output_path) as workbook:
+            workbook.add_sheet(SUMMARY_HEADERS, "年次", column_width=20).write_dataframe(build_summary(yearly))
+            for month, month_total in monthly.groupby('月'):
+                workbook.add_sheet(SUMMARY_HEADERS, f"{month}月", column_width=20).write_dataframe(
+                    build_summary(month_total.drop(columns='月').reset_index(drop=True)))
+
+            # 社員別（社員ごとに月の行と年間の行）
+            by_driver = pd.concat([monthly, yearly.assign(月='年間')], ignore_index=True)
+            by_driver = by_driver.sort_values(['社員', '月'], kind='stable', ignore_index=True)
+            by_driver['誤配率'] = [round(calculate_misdelivery_rate(total, errors), 2)
+                                for total, errors in zip(by_driver['持ち出し総数'], by_driver['誤配数'])]
+            workbook.add_sheet(['社員', '月', *SUM_COLUMNS, '誤配率'], "社員別", column_width=20).write_dataframe(
+                by_driver[['社員', '月', *SUM_COLUMNS, '誤配率']])
+        return output_path